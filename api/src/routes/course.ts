@@ -3,6 +3,7 @@ import express from "express";
 import dotenv from "dotenv";
 import prisma from "../db/prisma";
 import { getUserIdFromSession, updateSession } from "../utils/session";
+import { invalidateMlUserCache } from "../utils/mlCache";
 import multer from "multer";
 import path from "path";
 import fs from "fs";
@@ -243,6 +244,7 @@ router.post("/add-certificate", upload.single('pdf'), async (req, res) => {
       },
     });
 
+    invalidateMlUserCache(Number(userId));
     res.status(201).json({
       message: "Certificate added successfully",
       certificate: newCertificate,
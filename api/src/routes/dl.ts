@@ -3,6 +3,7 @@ import express from "express";
 import dotenv from "dotenv";
 import prisma from "../db/prisma";
 import { getUserIdFromSession } from "../utils/session";
+import { invalidateMlUserCache, refreshMlCatalog } from "../utils/mlCache";
 
 dotenv.config();
 
@@ -507,6 +508,8 @@ router.put("/acceptPostulation", async (req, res) => {
       return updatedPosition;
     });
 
+    invalidateMlUserCache(postulationUserId);
+    refreshMlCatalog("positions", [positionId]);
     res.status(200).json({ 
       success: true,
       message: "Postulation accepted and user assigned successfully",
@@ -3,6 +3,7 @@ import express from "express";
 import dotenv from "dotenv";
 import prisma from "../db/prisma";
 import { getUserIdFromSession } from "../utils/session";
+import { invalidateMlUserCache } from "../utils/mlCache";
 
 dotenv.config();
 
@@ -160,6 +161,7 @@ router.delete("/skills/:skillId", async (req, res) => {
       return res.status(404).json({ error: "Skill not found." });
     }
 
+    invalidateMlUserCache(userId);
     res.status(200).json({ message: "Skill deleted successfully." });
   } catch (error) {
     console.error("Error deleting user skill:", error);
@@ -220,6 +222,7 @@ router.post("/skills", async (req, res) => {
       });
     });
 
+    invalidateMlUserCache(userId);
     res.status(200).json({ message: "Skills added successfully." });
   } catch (error) {
     console.error("Error adding user skills:", error);
@@ -1158,6 +1161,7 @@ router.post("/goals", async (req, res) => {
       },
     });
 
+    invalidateMlUserCache(userId);
     res
       .status(201)
       .json({ message: "Goal assigned to user successfully", goal_id });
@@ -1240,6 +1244,7 @@ router.patch("/goals", async (req, res) => {
       },
     });
 
+    invalidateMlUserCache(userId);
     res.status(200).json({ message: "Goal updated successfully." });
   } catch (error) {
     console.error("Error updating goal:", error);
@@ -262,4 +262,26 @@ router.get("/certificates/:certificateId/skills", async (req, res) => {
   }
 });
 
+// skills of every certificate in one call, used by the ML service at startup
+router.get("/certificates-skills", async (req, res) => {
+  try {
+    const skills = await prisma.certificate_Skills.findMany({
+      include: {
+        Skills: true,
+      },
+    });
+
+    const formattedSkills = skills.map((skill) => ({
+      certificate_id: skill.certificate_id,
+      skill_id: skill.skill_id,
+      skill_name: skill.Skills.name,
+    }));
+
+    res.status(200).json(formattedSkills);
+  } catch (error) {
+    console.error("Error fetching certificate skills:", error);
+    res.status(500).json({ error: "Failed to fetch certificate skills" });
+  }
+});
+
 export default router;
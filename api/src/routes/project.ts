@@ -3,6 +3,7 @@ import express from "express";
 import dotenv from "dotenv";
 import prisma from "../db/prisma";
 import { updateSession, getUserIdFromSession } from "../utils/session";
+import { refreshMlCatalog } from "../utils/mlCache";
 
 dotenv.config();
 
@@ -496,6 +497,7 @@ router.post("/create", async (req, res) => {
       },
     });
 
+    const createdPositionIds: number[] = [];
     for (const position of positions) {
       const capabilityId = await prisma.capability.findFirst({
         where: {
@@ -515,6 +517,7 @@ router.post("/create", async (req, res) => {
           user_id: null,
         },
       });
+      createdPositionIds.push(createdPosition.position_id);
 
       for (const skill_id of position.skills) {
         await prisma.project_Position_Skills.create({
@@ -535,6 +538,7 @@ router.post("/create", async (req, res) => {
       }
     }
 
+    refreshMlCatalog("positions", createdPositionIds);
     res.status(201).json({ message: "Project created successfully", project });
   } catch (error) {
     console.error("Error creating project:", error);
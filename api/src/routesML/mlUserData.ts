@@ -199,4 +199,55 @@ router.get("/position/:position_id", async (req, res) => {
   }
 });
 
+// ids of every user, used by the ML service batch jobs
+router.get("/all_users", async (req, res) => {
+  try {
+    const users = await prisma.users.findMany({
+      select: { user_id: true },
+      orderBy: { user_id: "asc" },
+    });
+
+    res.status(200).json(users.map((user) => user.user_id));
+  } catch (error) {
+    console.error("Error fetching users:", error);
+    res.status(500).json({ error: "Internal server error" });
+  }
+});
+
+// skills of every available position in one call
+router.get("/all_positions_skills", async (req, res) => {
+  try {
+    // same filter as /all_positions: project date is in the future
+    const currentDate = new Date();
+    const positionSkills = await prisma.project_Position_Skills.findMany({
+      where: {
+        Project_Positions: {
+          AND: {
+            Projects: {
+              start_date: {
+                gte: currentDate,
+              },
+            },
+            user_id: null,
+          },
+        },
+      },
+      include: {
+        Skills: true,
+      },
+    });
+
+    const formattedPositionSkills = positionSkills.map((p) => ({
+      position_id: p.position_id,
+      skill_id: p.skill_id,
+      skill_name: p.Skills.name,
+    }));
+
+    res.status(200).json(formattedPositionSkills);
+  } catch (error) {
+    console.error("Error fetching position skills:", error);
+    res.status(500).json({ error: "Internal server error" });
+  }
+});
+
 export default router;
@@ -0,0 +1,49 @@
+import axios from "axios";
+
+// Tell the ML service that a user's skills, certificates, positions or goals
+// changed, so it drops the cached data and vectors used for recommendations.
+// Failures are only logged: the ML cache also expires on its own.
+async function invalidateMlUserCache(userId: number) {
+  const mlServiceUrl = process.env.ML_SERVICE_URL;
+  if (!mlServiceUrl) {
+    return;
+  }
+
+  try {
+    await axios.post(`${mlServiceUrl}/cache/invalidate/${userId}`, null, {
+      headers: { "admin-password": process.env.ADMIN_PASSWORD_ML },
+      timeout: 2000,
+    });
+  } catch (error) {
+    console.error("Error invalidating ML user cache:", error.message);
+  }
+}
+
+// Tell the ML service that some certificates or positions were created,
+// changed or are no longer available, so it updates its models for just
+// those items. Failures are only logged: the ML service also retrains on a
+// timer.
+async function refreshMlCatalog(
+  kind: "certificates" | "positions",
+  ids: number[]
+) {
+  const mlServiceUrl = process.env.ML_SERVICE_URL;
+  if (!mlServiceUrl || ids.length === 0) {
+    return;
+  }
+
+  try {
+    await axios.post(
+      `${mlServiceUrl}/catalog/${kind}/refresh`,
+      { ids },
+      {
+        headers: { "admin-password": process.env.ADMIN_PASSWORD_ML },
+        timeout: 5000,
+      }
+    );
+  } catch (error) {
+    console.error("Error refreshing ML catalog:", error.message);
+  }
+}
+
+export { invalidateMlUserCache, refreshMlCatalog };
@@ -8,6 +8,8 @@ import toast, { Toaster } from 'react-hot-toast';
 import { FaMicrophone, FaMicrophoneSlash, FaVideo, FaVideoSlash, FaPhone, FaDotCircle, FaStopCircle } from 'react-icons/fa';
 
 const apiUrl = process.env.NEXT_PUBLIC_FLASK_WEB_API_URL || 'http://localhost:5002';
+const RECORDING_TIMESLICE_MS = 5000; // The recording is uploaded in chunks of this many milliseconds
+const MAX_CHUNK_ATTEMPTS = 5;
 
 const MeetingPage: React.FC = () => {
   const router = useRouter();
@@ -28,7 +30,8 @@ const MeetingPage: React.FC = () => {
   const [recording, setRecording] = useState(false);
   const canvasRef = useRef<HTMLCanvasElement | null>(null);
   const mediaRecorder = useRef<MediaRecorder | null>(null);
-  const recordedChunks = useRef<Blob[]>([]);
+  const uploadQueue = useRef<Promise<void>>(Promise.resolve()); // Chunks are uploaded one at a time, in order
+  const uploadOffset = useRef(0); // Bytes of the recording the server has acknowledged
 
   const errorHandler = (error: Error) => {
     console.error('Error occurred:', error);
@@ -162,11 +165,70 @@ const MeetingPage: React.FC = () => {
     });
   };
 
-  const startRecording = () => {
+  const uploadChunk = async (chunk: Blob) => {
+    const start = uploadOffset.current; // Where this chunk begins in the recording
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const response = await fetch(
+          `${apiUrl}/api/upload-video/chunk?meeting_id=${meetingId}&offset=${uploadOffset.current}`,
+          {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/octet-stream' },
+            body: chunk.slice(uploadOffset.current - start), // Skip what the server already has
+          }
+        );
+        if (response.ok) {
+          uploadOffset.current = (await response.json()).offset;
+          return;
+        }
+      } catch (error) {
+        console.error('Error uploading recording chunk:', error);
+      }
+
+      if (attempt === MAX_CHUNK_ATTEMPTS) {
+        throw new Error('Failed to upload video. Please try again.');
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+
+      // Resume from the last offset the server acknowledged
+      let offset = uploadOffset.current;
+      try {
+        const status = await fetch(`${apiUrl}/api/upload-video/status?meeting_id=${meetingId}`);
+        if (status.ok) {
+          offset = (await status.json()).offset;
+        }
+      } catch (error) {
+        console.error('Error checking recording upload:', error);
+      }
+      if (offset < start || offset > start + chunk.size) {
+        throw new Error('Recording upload is out of sync. Please try again.');
+      }
+      uploadOffset.current = offset;
+    }
+  };
+
+  const startRecording = async () => {
     const canvas = canvasRef.current;
     if (!canvas) return;
   
     drawStreamsOnCanvas();
+
+    try {
+      const response = await fetch(`${apiUrl}/api/upload-video/init`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ meeting_id: meetingId }),
+      });
+      if (!response.ok) {
+        throw new Error('Failed to start recording upload. Please try again.');
+      }
+      uploadOffset.current = (await response.json()).offset;
+      uploadQueue.current = Promise.resolve();
+    } catch (error) {
+      console.error('Error starting recording upload:', error);
+      toast.error((error as Error).message);
+      return;
+    }
   
     // Capture video stream from canvas
     const canvasStream = canvas.captureStream();
@@ -179,20 +241,19 @@ const MeetingPage: React.FC = () => {
     mediaRecorder.current = new MediaRecorder(combinedStream);
     mediaRecorder.current.ondataavailable = (event) => {
       if (event.data.size > 0) {
-        recordedChunks.current.push(event.data);
+        // Upload each chunk as soon as it is recorded; a failed chunk stops the ones after it
+        const chunk = event.data;
+        uploadQueue.current = uploadQueue.current.then(() => uploadChunk(chunk));
       }
     };
   
     mediaRecorder.current.onstop = async () => {
-      const blob = new Blob(recordedChunks.current, { type: 'video/webm' });
-      const formData = new FormData();
-      formData.append('video', blob, 'meeting_recording.webm');
-      formData.append('meeting_id', meetingId as string);
-  
       try {
-        const response = await fetch(`${apiUrl}/api/upload-video`, {
+        await uploadQueue.current;
+        const response = await fetch(`${apiUrl}/api/upload-video/finalize`, {
           method: 'POST',
-          body: formData,
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ meeting_id: meetingId, size: uploadOffset.current }),
         });
         if (!response.ok) {
           throw new Error('Failed to upload video. Please try again.');
@@ -204,7 +265,7 @@ const MeetingPage: React.FC = () => {
       }
     };
   
-    mediaRecorder.current.start();
+    mediaRecorder.current.start(RECORDING_TIMESLICE_MS);
     setRecording(true);
     toast.success('Recording started');
   };
@@ -213,7 +274,6 @@ const MeetingPage: React.FC = () => {
     if (mediaRecorder.current) {
       mediaRecorder.current.stop();
       setRecording(false);
-      recordedChunks.current = [];
       toast.success('Recording stopped and uploading...');
     }
   };
@@ -1,12 +1,27 @@
-from flask import Flask, jsonify, request
+from flask import Flask, abort, jsonify, make_response, request
 from flask_cors import CORS
 from data_fetcher import DataFetcher
-from feature_engineer import RecommenderFeaturizer
-from certificates_recommender import CertificateRecommender
-from positions_recommender import PositionsRecommender
+from feature_engineer import RecommenderFeaturizer, noUser
+from catalog_loader import (
+    has_models,
+    load_models,
+    refresh_certificates,
+    refresh_positions,
+    save_models,
+    train_models,
+)
+from user_cache import UserCache
+from recommendation_store import RecommendationStore
+from batch import batch_responses
+from model_reloader import ModelReloader, Models, refit_models
+from single_flight import SingleFlight
+from worker_events import WorkerEvents
 import numpy as np
 from dotenv import load_dotenv
+import hmac
 import os
+import time
+from typing import Callable, Dict, List, Tuple
 
 load_dotenv()
 
@@ -16,55 +31,234 @@ CORS(app)
 # Initialize components
 data_fetcher_url = os.getenv("DATA_API_URL_HOST_DOCKER")
 data_fetcher = DataFetcher(data_fetcher_url)
-featurizer = RecommenderFeaturizer(data_fetcher)
-certificateRecommender = CertificateRecommender()
-positionsRecommender = PositionsRecommender()
-
-skills = data_fetcher.get_all_skills()
-
-# Pre-load certificates and skills
-certificates = data_fetcher.get_all_certificates()
-certificates_with_skills = [
-    {
-        "id": cert["certificate_id"],
-        "skills": data_fetcher.get_certificate_skills(cert["certificate_id"]),
-        "provider": cert.get("provider"),
-    }
-    for cert in certificates
-]
+user_cache = UserCache(
+    max_users=int(os.getenv("USER_CACHE_MAX_USERS", 10000)),
+    ttl=float(os.getenv("USER_CACHE_TTL", 300)),
+)
+# Filled by precompute.py; routes fall back to live scoring on stale rows
+recommendation_store = RecommendationStore(
+    os.getenv("RECOMMENDATION_STORE_PATH", "recommendations.sqlite3"),
+    max_age=float(os.getenv("RECOMMENDATION_STORE_MAX_AGE", 86400)),
+)
 
-certificate_provider_map = {
-    cert["id"]: cert["provider"] for cert in certificates_with_skills
-}
+# Admin actions (cache invalidation, catalog refreshes, model rebuilds)
+# handled by one worker process are replayed by the others
+worker_events = WorkerEvents(recommendation_store.path)
 
-certificateRecommender.train(certificates_with_skills)
+# Start from the models built by build_models.py when present (memory-mapped,
+# so workers share one copy); otherwise fetch the catalogs and train here
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "models")
 
 
-positions = data_fetcher.get_all_positions()
-positions_with_skills = [
-    {
-        "id": position["position_id"],
-        "skills": data_fetcher.get_position_skills(position["position_id"]),
-    }
-    for position in positions
-]
-positionsRecommender.train(positions_with_skills)
+def build_models() -> Models:
+    """Fresh models trained on the current catalogs of the Express API.
+
+    With MODEL_ARTIFACT_DIR they are published there as a new artifact and
+    loaded back memory-mapped, and the other workers switch to them too.
+    """
+    since = worker_events.last()
+    skills = data_fetcher.get_all_skills()
+    featurizer = RecommenderFeaturizer(data_fetcher, skills)
+    certificates, positions = train_models(data_fetcher, featurizer.skill_ids)
+    if not MODEL_ARTIFACT_DIR:
+        return Models(certificates, positions, featurizer)
 
+    save_models(MODEL_ARTIFACT_DIR, certificates, positions, skills, since)
+    return published_models(worker_events.publish("models"))
 
-def noUser(user_data):
-    all_empty = all(
-        (
-            not user_data[key] or all(not v for v in user_data[key].values())
-            if isinstance(user_data[key], dict)
-            else not user_data[key]
+
+def catalog_edit(kind: str, item_ids: List[int]) -> Callable[[Models], Models]:
+    """ModelReloader.apply() edit re-reading the given certificates or positions"""
+    if kind == "certificates":
+        return lambda models: models._replace(
+            certificates=refresh_certificates(
+                data_fetcher, models.certificates, item_ids
+            )
         )
-        for key in user_data
+    return lambda models: models._replace(
+        positions=refresh_positions(data_fetcher, models.positions, item_ids)
+    )
+
+
+def replayed_artifact(until: int) -> Tuple[Models, List[Dict]]:
+    """The published artifact, with the catalog refreshes recorded after it
+    was built (up to event until) replayed on top, and its skill list"""
+    certificates, positions, skills, since = load_models(MODEL_ARTIFACT_DIR)
+    models = Models(
+        certificates, positions, RecommenderFeaturizer(data_fetcher, skills)
+    )
+    for _, _, kind, payload in worker_events.between(since, until):
+        if kind == "refresh":
+            models = catalog_edit(payload["kind"], payload["ids"])(models)
+    return models, skills
+
+
+def published_models(until: int) -> Models:
+    """Models of the published artifact up to event until, see replayed_artifact"""
+    return replayed_artifact(until)[0]
+
+
+def republish_models(until: int) -> Models:
+    """Publish the artifact with the catalog refreshes up to event until
+    folded in (refit once MODEL_MAX_INCREMENTAL_EDITS pile up), so workers
+    map one shared copy of the edited models instead of each keeping its own"""
+    models, skills = replayed_artifact(until)
+    if max(models.certificates.edits, models.positions.edits) >= (
+        model_reloader.max_edits
+    ):
+        models = refit_models(models)
+    save_models(
+        MODEL_ARTIFACT_DIR, models.certificates, models.positions, skills, until
+    )
+    return published_models(worker_events.publish("models"))
+
+
+def replay_worker_event(seq: int, kind: str, payload: Dict) -> None:
+    """Apply an admin action another worker handled"""
+    if kind == "invalidate":
+        user_cache.invalidate(payload["user_id"])
+    elif kind == "refresh" and not MODEL_ARTIFACT_DIR:
+        model_reloader.apply(catalog_edit(payload["kind"], payload["ids"]))
+    elif kind == "models" and MODEL_ARTIFACT_DIR:
+        # With artifacts, catalog refreshes arrive this way too: their worker
+        # republishes the edited models
+        model_reloader.replace(lambda _: published_models(seq))
+
+
+# Events up to here are in the initial models; later ones are replayed
+worker_events_after = worker_events.last()
+
+
+def load_initial_models() -> Models:
+    if has_models(MODEL_ARTIFACT_DIR):
+        return published_models(worker_events_after)
+    return build_models()
+
+
+# Rebuilt from the Express API in the background every MODEL_RELOAD_INTERVAL
+# seconds or on POST /models/reload; each request works on the snapshot it
+# started with
+model_reloader = ModelReloader(
+    build_models,
+    interval=float(os.getenv("MODEL_RELOAD_INTERVAL", 3600)),
+    max_edits=int(os.getenv("MODEL_MAX_INCREMENTAL_EDITS", 100)),
+    load=load_initial_models,
+).start()
+worker_events.follow(
+    replay_worker_event,
+    worker_events_after,
+    interval=float(os.getenv("WORKER_EVENTS_POLL_INTERVAL", 1)),
+)
+
+# Number of recommendations each route renders by default
+CERTIFICATE_RESULTS = 5
+POSITION_RESULTS = 100
+# Users one /recommend/batch call may ask for; larger jobs send several calls
+BATCH_MAX_USERS = int(os.getenv("BATCH_MAX_USERS", 1000))
+
+
+# Concurrent identical requests (e.g. the dashboard firing the same call
+# several times at login) share one computation and one set of upstream calls
+user_data_flights = SingleFlight()
+recommendation_flights = SingleFlight()
+
+
+def get_user_data(user_id):
+    return user_cache.get_user_data(
+        user_id,
+        lambda: user_data_flights.do(
+            user_id, lambda: data_fetcher.get_user_data(user_id)
+        ),
+    )
+
+
+def coalesced_response(kind: str, models: Models, user_id: int, top_n: int, respond):
+    """respond(models, user_id, user_data, top_n) for a fetched user, None if
+    the user does not exist; shared by concurrent calls for the same user,
+    route, model version and top_n"""
+    model = models.certificates if kind == "certificates" else models.positions
+
+    def compute():
+        user_data = get_user_data(user_id)
+        if noUser(user_data):
+            return None
+        return respond(models, user_id, user_data, top_n)
+
+    return recommendation_flights.do(
+        (user_id, kind, model.model_version, top_n), compute
+    )
+
+
+def certificate_response(
+    models: Models, user_id: int, user_data: Dict, top_n: int
+) -> Dict:
+    """Body of /recommend/certificates for a user whose data is fetched"""
+    certificateRecommender, featurizer = models.certificates, models.featurizer
+    exclude_ids = featurizer.owned_certificate_ids(user_data)
+    existing_providers = certificateRecommender.providers_of(exclude_ids)
+    user_skill_ids = featurizer.user_skill_ids(user_data)
+
+    # One vector over the shared vocabulary, reused by both routes
+    user_vector = user_cache.get_user_vector(
+        user_id,
+        ("skills", featurizer.vocabulary_version),
+        lambda: featurizer.create_user_vector(user_data),
+    )
+
+    recommendations = certificateRecommender.recommend(
+        user_vector,
+        exclude_ids,
+        existing_providers,
+        top_n=top_n,
+        diversity_lambda=0.85,
+    )
+
+    recommendations = [
+        certificateRecommender.describe(cert, user_skill_ids)
+        for cert in recommendations
+    ]
+
+    return {
+        "user_id": user_id,
+        "user_skills": featurizer.user_skill_names(user_skill_ids),
+        "recommendations": recommendations,
+    }
+
+
+def position_response(
+    models: Models, user_id: int, user_data: Dict, top_n: int
+) -> Dict:
+    """Body of /recommend/positions for a user whose data is fetched.
+
+    user_skills holds the names of the user's skills, as on
+    /recommend/certificates; it used to come back empty for positions.
+    """
+    positionsRecommender, featurizer = models.positions, models.featurizer
+    exclude_ids = featurizer.owned_position_ids(user_data)
+    user_skill_ids = featurizer.user_skill_ids(user_data)
+
+    # Create feature vector
+    user_vector = user_cache.get_user_vector(
+        user_id,
+        ("skills", featurizer.vocabulary_version),
+        lambda: featurizer.create_user_vector(user_data),
     )
 
-    if all_empty:
-        return True
+    # Get recommendations
+    recommendations = positionsRecommender.recommend(
+        user_vector, exclude_ids, top_n=top_n, diversity_lambda=0.85
+    )
 
-    return False
+    recommendations = [
+        positionsRecommender.describe(position, user_skill_ids)
+        for position in recommendations
+    ]
+
+    return {
+        "user_id": user_id,
+        "user_skills": featurizer.user_skill_names(user_skill_ids),
+        "recommendations": recommendations,
+    }
 
 
 @app.route(
@@ -72,199 +266,168 @@ def noUser(user_data):
     methods=["GET"],
 )
 def recommend_certificates(user_id: int):
+    models = model_reloader.models
     try:
-        user_data = data_fetcher.get_user_data(user_id)
-        if noUser(user_data):
+        top_n = request.args.get("top_n", CERTIFICATE_RESULTS, type=int)
+        stored = recommendation_store.get(
+            user_id, "certificates", models.certificates.model_version, top_n
+        )
+        if stored is not None:
+            return jsonify(stored)
+
+        body = coalesced_response(
+            "certificates", models, user_id, top_n, certificate_response
+        )
+        if body is None:
             return jsonify({"error": "User not found"}), 404
 
-        certificates_data = user_data.get("certificates", {})
+        return jsonify(body)
 
-        if (
-            isinstance(certificates_data, dict)
-            and "certificate_id" in certificates_data
-        ):
-            exclude_ids = certificates_data["certificate_id"]
-        else:
-            exclude_ids = [
-                c["certificate_id"] for c in certificates_data if "certificate_id" in c
-            ]
-
-        existing_providers = list(
-            set(
-                certificate_provider_map[cert_id]
-                for cert_id in exclude_ids
-                if cert_id in certificate_provider_map
-            )
+    except Exception as e:
+        return jsonify({"error": e}), 500
+
+
+@app.route(
+    "/recommend/positions/<int:user_id>",
+    methods=["GET"],
+)
+def recommend_positions(user_id: int):
+    models = model_reloader.models
+    try:
+        top_n = request.args.get("top_n", POSITION_RESULTS, type=int)
+        stored = recommendation_store.get(
+            user_id, "positions", models.positions.model_version, top_n
         )
+        if stored is not None:
+            return jsonify(stored)
 
-        user_skill_ids = set()
-        user_skill_ids.update(user_data.get("skills", {}).get("skills_id", []))
-        user_skill_ids.update(user_data.get("certificates", {}).get("skills_id", []))
-        user_skill_ids.update(user_data.get("positions", {}).get("skills_id", []))
+        body = coalesced_response(
+            "positions", models, user_id, top_n, position_response
+        )
+        if body is None:
+            return jsonify({"error": "User not found"}), 404
 
-        all_skills = certificateRecommender.skill_ids
+        return jsonify(body)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        user_vector = featurizer.create_user_vector(user_data, all_skills)
 
-        recommendations = certificateRecommender.recommend(
-            user_vector, exclude_ids, existing_providers, diversity_lambda=0.85
+def require_admin() -> None:
+    """Abort with 401 unless the request carries ADMIN_PASSWORD_ML; with the
+    password unset or empty every admin request is refused"""
+    password = os.getenv("ADMIN_PASSWORD_ML", "")
+    given = request.headers.get("admin-password", "")
+    if not password or not hmac.compare_digest(given.encode(), password.encode()):
+        abort(make_response(jsonify({"error": "Unauthorized"}), 401))
+
+
+def is_json_int(value) -> bool:
+    """True for a JSON integer (bool is an int subclass, so it is excluded)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch_route():
+    """Recommendations for many users in one call.
+
+    Body: {"user_ids": [...], "certificates_top_n": 5, "positions_top_n": 100};
+    at most BATCH_MAX_USERS distinct ids per call. Admin only.
+    """
+    require_admin()
+    models = model_reloader.models
+    body = request.get_json(silent=True) or {}
+    user_ids = body.get("user_ids", [])
+    certificate_top_n = body.get("certificates_top_n", CERTIFICATE_RESULTS)
+    position_top_n = body.get("positions_top_n", POSITION_RESULTS)
+    if not isinstance(user_ids, list) or not all(
+        is_json_int(value) for value in (*user_ids, certificate_top_n, position_top_n)
+    ):
+        return jsonify({"error": "user_ids and top_n values must be integers"}), 400
+    # Duplicates are fetched and scored once, keeping the first position
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > BATCH_MAX_USERS:
+        return (
+            jsonify({"error": f"At most {BATCH_MAX_USERS} user_ids per call"}),
+            400,
         )
 
-        certificatesDict = data_fetcher.get_all_certificates()
-
-        recommendations = [
-            {
-                "certificate_id": cert["certificate_id"],
-                "certificate_name": next(
-                    (
-                        cert_data["certificate_name"]
-                        for cert_data in certificatesDict
-                        if cert_data["certificate_id"] == cert["certificate_id"]
-                    ),
-                    None,
-                ),
-                "certificate_desc": next(
-                    (
-                        cert_data["certificate_desc"]
-                        for cert_data in certificatesDict
-                        if cert_data["certificate_id"] == cert["certificate_id"]
-                    )
-                ),
-                "provider": certificate_provider_map.get(cert["certificate_id"]),
-                "score": cert["mmr_score"],
-                "skills": [
-                    skill["skill_name"]
-                    for skill in data_fetcher.get_certificate_skills(
-                        cert["certificate_id"]
-                    )
-                ],
-                "coincident_skills": [
-                    skill["skill_name"]
-                    for skill in data_fetcher.get_certificate_skills(
-                        cert["certificate_id"]
-                    )
-                    if skill["skill_id"] in user_skill_ids
-                ],
-                "certificate_estimated_time": next(
-                    (
-                        cert_data["certificate_estimated_time"]
-                        for cert_data in certificatesDict
-                        if cert_data["certificate_id"] == cert["certificate_id"]
-                    ),
-                    None,
-                ),
-                "certificate_level": next(
-                    (
-                        cert_data["certificate_level"]
-                        for cert_data in certificatesDict
-                        if cert_data["certificate_id"] == cert["certificate_id"]
-                    ),
-                    None,
-                ),
-            }
-            for cert in recommendations
-        ][:5]
+    try:
+        started = time.perf_counter()
+        users_data = data_fetcher.get_users_data(user_ids)
+        not_found = [user_id for user_id in user_ids if noUser(users_data[user_id])]
+        for user_id in not_found:
+            del users_data[user_id]
+
+        responses = batch_responses(
+            users_data,
+            models.featurizer,
+            models.certificates,
+            models.positions,
+            certificate_top_n=certificate_top_n,
+            position_top_n=position_top_n,
+        )
+        elapsed = time.perf_counter() - started
 
         return jsonify(
             {
-                "user_id": user_id,
-                "user_skills": [
-                    skill["skill_name"]
-                    for skill in skills
-                    if skill["skill_id"] in user_skill_ids
-                ],
-                "recommendations": recommendations,
+                "results": responses,
+                "not_found": not_found,
+                "users_per_second": len(responses) / elapsed if elapsed else None,
             }
         )
-
     except Exception as e:
-        return jsonify({"error": e}), 500
+        return jsonify({"error": str(e)}), 500
 
 
-@app.route(
-    "/recommend/positions/<int:user_id>",
-    methods=["GET"],
-)
-def recommend_positions(user_id: int):
-    try:
-        # Get user data
-        user_data = data_fetcher.get_user_data(user_id)
-        if noUser(user_data):
-            return jsonify({"error": "User not found"}), 404
+@app.route("/cache/invalidate", methods=["POST"])
+@app.route("/cache/invalidate/<int:user_id>", methods=["POST"])
+def invalidate_user_cache(user_id: int = None):
+    """Called by the Express API when a user's skills, certificates,
+    positions or goals change; without user_id the whole cache is dropped"""
+    require_admin()
 
-        position_data = user_data.get("positions", {})
+    user_cache.invalidate(user_id)
+    recommendation_store.invalidate(user_id)
+    worker_events.publish("invalidate", {"user_id": user_id})
+    return jsonify({"invalidated": user_id, "cache": user_cache.stats()})
 
-        if isinstance(position_data, dict) and "position_id" in position_data:
-            exclude_ids = position_data["position_id"]
-        else:
-            exclude_ids = [
-                p["position_id"] for p in position_data if "position_id" in p
-            ]
 
-        user_skill_ids = set()
-        user_skill_ids.update(user_data.get("skills", {}).get("skills_id", []))
-        user_skill_ids.update(user_data.get("certificates", {}).get("skills_id", []))
-        user_skill_ids.update(user_data.get("positions", {}).get("skills_id", []))
+@app.route("/models/reload", methods=["POST"])
+def reload_models():
+    """Called by the Express API when the catalogs change; the reload runs in
+    the background and this returns immediately. The rebuilt models are
+    published to the other workers once trained."""
+    require_admin()
 
-        # Create feature vector
-        all_skills = positionsRecommender.skills_ids
+    model_reloader.request_reload()
+    return jsonify({"reload_requested": True, "models": model_reloader.stats()}), 202
 
-        user_vector = featurizer.create_user_vector(user_data, all_skills)
 
-        # Get recommendations
-        recommendations = positionsRecommender.recommend(
-            user_vector, exclude_ids, diversity_lambda=0.85
-        )
+@app.route("/catalog/<kind>/refresh", methods=["POST"])
+def refresh_catalog(kind: str):
+    """Re-read a few certificates or positions from the Express API and
+    update the live model incrementally.
 
-        positionsDict = data_fetcher.get_all_positions()
+    Body: {"ids": [...]}; ids that no longer exist are removed. With
+    MODEL_ARTIFACT_DIR the edited models are published as a new artifact.
+    """
+    require_admin()
 
-        recommendations = [
-            {
-                "position_id": position["position_id"],
-                "position_name": next(
-                    (
-                        position_data["position_name"]
-                        for position_data in positionsDict
-                        if position_data["position_id"] == position["position_id"]
-                    ),
-                    None,
-                ),
-                "position_description": next(
-                    (
-                        position_data["position_desc"]
-                        for position_data in positionsDict
-                        if position_data["position_id"] == position["position_id"]
-                    )
-                ),
-                "score": position["mmr_score"],
-                "skills": [
-                    skill["skill_name"]
-                    for skill in data_fetcher.get_position_skills(
-                        position["position_id"]
-                    )
-                ],
-                "coincident_skills": [
-                    skill["skill_name"]
-                    for skill in data_fetcher.get_position_skills(
-                        position["position_id"]
-                    )
-                    if skill["skill_id"] in user_skill_ids
-                ],
-            }
-            for position in recommendations
+    try:
+        item_ids = [
+            int(item_id) for item_id in (request.get_json() or {}).get("ids", [])
         ]
+        if kind not in ("certificates", "positions"):
+            return jsonify({"error": f"Unknown catalog {kind}"}), 404
 
-        return jsonify(
-            {
-                "user_id": user_id,
-                "user_skills": [
-                    skill["skill_name"]
-                    for skill in skills
-                    if skill["skill_id"] in user_vector
-                ],
-                "recommendations": recommendations,
-            }
-        )
+        if MODEL_ARTIFACT_DIR:
+            seq = worker_events.publish("refresh", {"kind": kind, "ids": item_ids})
+            model_reloader.replace(lambda _: republish_models(seq))
+        else:
+            model_reloader.apply(catalog_edit(kind, item_ids))
+            worker_events.publish("refresh", {"kind": kind, "ids": item_ids})
+
+        return jsonify({"refreshed": item_ids, "models": model_reloader.stats()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
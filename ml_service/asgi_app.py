@@ -0,0 +1,136 @@
+"""asyncio serving mode: the same API as app.py as an ASGI application.
+
+The two recommendation routes are served natively: user data comes from the
+Express API through AsyncDataFetcher, so a request waiting on it holds no
+thread, and the CPU-bound featurization and scoring run on a thread pool
+(SCORING_THREADS) off the event loop. Every other route is the Flask app
+mounted as WSGI. Run it with serve.py.
+"""
+
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    CERTIFICATE_RESULTS,
+    POSITION_RESULTS,
+    app as flask_app,
+    certificate_response,
+    model_reloader,
+    position_response,
+    recommendation_store,
+    user_cache,
+)
+from async_data_fetcher import AsyncDataFetcher
+from feature_engineer import noUser
+from single_flight import AsyncSingleFlight
+
+SCORING_THREADS = int(os.getenv("SCORING_THREADS", os.cpu_count() or 1))
+
+# Event-loop counterparts of app.py's flights
+user_data_flights = AsyncSingleFlight()
+recommendation_flights = AsyncSingleFlight()
+
+
+async def run_scoring(request: Request, function, *args):
+    """Run a CPU-bound call on the scoring pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(
+        request.app.state.scoring_executor, functools.partial(function, *args)
+    )
+
+
+async def get_user_data(request: Request, user_id: int):
+    data_fetcher = request.app.state.data_fetcher
+    return await user_cache.get_user_data_async(
+        user_id,
+        lambda: user_data_flights.do(
+            user_id, lambda: data_fetcher.get_user_data(user_id)
+        ),
+    )
+
+
+def top_n_param(request: Request, default: int) -> int:
+    """?top_n=, falling back to default when absent or not an int (as Flask's
+    request.args.get(type=int) does)"""
+    try:
+        return int(request.query_params["top_n"])
+    except (KeyError, ValueError):
+        return default
+
+
+async def recommend(request: Request, kind: str, default_top_n: int, respond):
+    models = model_reloader.models
+    model = models.certificates if kind == "certificates" else models.positions
+    try:
+        user_id = request.path_params["user_id"]
+        top_n = top_n_param(request, default_top_n)
+        stored = await run_scoring(
+            request, recommendation_store.get, user_id, kind, model.model_version, top_n
+        )
+        if stored is not None:
+            return JSONResponse(stored)
+
+        async def compute():
+            user_data = await get_user_data(request, user_id)
+            if noUser(user_data):
+                return None
+            return await run_scoring(
+                request, respond, models, user_id, user_data, top_n
+            )
+
+        # Shared by concurrent calls for the same user, route, model and top_n
+        body = await recommendation_flights.do(
+            (user_id, kind, model.model_version, top_n), compute
+        )
+        if body is None:
+            return JSONResponse({"error": "User not found"}, status_code=404)
+
+        return JSONResponse(body)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def recommend_certificates(request: Request):
+    return await recommend(
+        request, "certificates", CERTIFICATE_RESULTS, certificate_response
+    )
+
+
+async def recommend_positions(request: Request):
+    return await recommend(request, "positions", POSITION_RESULTS, position_response)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # Created per worker process, inside its event loop
+    app.state.data_fetcher = AsyncDataFetcher(os.getenv("DATA_API_URL_HOST_DOCKER"))
+    app.state.scoring_executor = ThreadPoolExecutor(
+        max_workers=SCORING_THREADS, thread_name_prefix="scoring"
+    )
+    yield
+    await app.state.data_fetcher.aclose()
+    app.state.scoring_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route(
+            "/recommend/certificates/{user_id:int}",
+            recommend_certificates,
+            methods=["GET"],
+        ),
+        Route(
+            "/recommend/positions/{user_id:int}", recommend_positions, methods=["GET"]
+        ),
+        Mount("/", WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from data_fetcher import RETRY_STATUSES, USER_DATA_ENDPOINTS
+
+load_dotenv()
+
+
+class AsyncDataFetcher:
+    """asyncio counterpart of DataFetcher.get_user_data for the ASGI app.
+
+    Waiting on the Express API no longer holds a thread: every request in
+    flight shares one event loop and one keep-alive connection pool, so the
+    pool (DATA_API_ASYNC_POOL_SIZE) rather than a thread count bounds
+    concurrency. Timeouts and retries follow DataFetcher's settings.
+    """
+
+    def __init__(
+        self,
+        api_base: str,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        pool_size: Optional[int] = None,
+    ):
+        self.base_url = api_base
+        self.retries = (
+            retries if retries is not None else int(os.getenv("DATA_API_RETRIES", 2))
+        )
+        pool_size = pool_size or int(os.getenv("DATA_API_ASYNC_POOL_SIZE", 100))
+
+        self.client = httpx.AsyncClient(
+            base_url=api_base,
+            headers={"admin-password": os.getenv("ADMIN_PASSWORD_ML", "")},
+            timeout=httpx.Timeout(
+                read_timeout or float(os.getenv("DATA_API_READ_TIMEOUT", 30)),
+                connect=connect_timeout
+                or float(os.getenv("DATA_API_CONNECT_TIMEOUT", 3.05)),
+            ),
+            # Retries connection failures; gateway errors are retried in _get
+            transport=httpx.AsyncHTTPTransport(
+                retries=self.retries,
+                limits=httpx.Limits(
+                    max_connections=pool_size, max_keepalive_connections=pool_size
+                ),
+            ),
+        )
+
+    async def _get(self, path: str) -> httpx.Response:
+        """GET a path of the Express API, retrying RETRY_STATUSES with backoff"""
+        for attempt in range(self.retries + 1):
+            response = await self.client.get(path)
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            await asyncio.sleep(0.2 * 2**attempt)
+
+    async def get_user_data(self, user_id: int) -> Dict:
+        """Fetch all relevant user data from Express API.
+
+        The four endpoints are requested concurrently, so the call costs about
+        one round trip.
+        """
+        responses = await asyncio.gather(
+            *(
+                self._get(f"/ml-user-data/{endpoint}/{user_id}")
+                for endpoint in USER_DATA_ENDPOINTS
+            )
+        )
+
+        data = {}
+        for endpoint, response in zip(USER_DATA_ENDPOINTS, responses):
+            if response.status_code == 200:
+                data[endpoint] = response.json()
+
+        return data
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
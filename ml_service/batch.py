@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from certificates_recommender import CertificateRecommender
+from feature_engineer import RecommenderFeaturizer
+from positions_recommender import PositionsRecommender
+
+# Users scored per sparse product; bounds the users x items score block in memory
+BATCH_CHUNK_SIZE = 256
+
+
+def recommend_batch(
+    users_data: Dict[int, Dict],
+    featurizer: RecommenderFeaturizer,
+    certificate_recommender: Optional[CertificateRecommender],
+    positions_recommender: Optional[PositionsRecommender],
+    certificate_top_n: int = 5,
+    position_top_n: int = 100,
+    diversity_lambda: float = 0.85,
+    workers: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+) -> Dict[int, Dict]:
+    """Recommend certificates and positions for many users at once.
+
+    users_data maps user id -> DataFetcher.get_user_data() output. Users are
+    featurized once into a users x skills matrix over the shared vocabulary
+    and scored against each catalog with one sparse matrix product per chunk
+    of chunk_size users; the MMR selection of every user then runs on a
+    thread pool. Pass None for a recommender to skip that item type.
+
+    Returns user id -> {"certificates": [...], "positions": [...]} with the
+    same entries as CertificateRecommender.recommend /
+    PositionsRecommender.recommend.
+    """
+    user_ids = list(users_data)
+    results = {user_id: {} for user_id in user_ids}
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start : start + chunk_size]
+            chunk_data = [users_data[user_id] for user_id in chunk]
+            # Featurized once over the shared vocabulary for both models
+            user_matrix = featurizer.create_user_matrix(chunk_data)
+
+            if certificate_recommender is not None:
+                exclude_ids = [
+                    featurizer.owned_certificate_ids(user_data)
+                    for user_data in chunk_data
+                ]
+                similarities = certificate_recommender.score_many(
+                    user_matrix,
+                    [certificate_recommender.providers_of(ids) for ids in exclude_ids],
+                )
+                selections = pool.map(
+                    lambda row: certificate_recommender.select(
+                        similarities[row],
+                        exclude_ids[row],
+                        top_n=certificate_top_n,
+                        diversity_lambda=diversity_lambda,
+                    ),
+                    range(len(chunk)),
+                )
+                for user_id, selection in zip(chunk, selections):
+                    results[user_id]["certificates"] = selection
+
+            if positions_recommender is not None:
+                exclude_ids = [
+                    featurizer.owned_position_ids(user_data) for user_data in chunk_data
+                ]
+                similarities = positions_recommender.score_many(user_matrix)
+                selections = pool.map(
+                    lambda row: positions_recommender.select(
+                        similarities[row],
+                        exclude_ids[row],
+                        top_n=position_top_n,
+                        diversity_lambda=diversity_lambda,
+                    ),
+                    range(len(chunk)),
+                )
+                for user_id, selection in zip(chunk, selections):
+                    results[user_id]["positions"] = selection
+
+    return results
+
+
+def batch_responses(
+    users_data: Dict[int, Dict],
+    featurizer: RecommenderFeaturizer,
+    certificate_recommender: CertificateRecommender,
+    positions_recommender: PositionsRecommender,
+    certificate_top_n: int = 5,
+    position_top_n: int = 100,
+    **kwargs,
+) -> Dict[int, Dict]:
+    """recommend_batch() rendered as the bodies of the per-user routes.
+
+    Returns user id -> {"certificates": body, "positions": body}, where each
+    body is what /recommend/certificates/<id> and /recommend/positions/<id>
+    would return for that user.
+    """
+    results = recommend_batch(
+        users_data,
+        featurizer,
+        certificate_recommender,
+        positions_recommender,
+        certificate_top_n=certificate_top_n,
+        position_top_n=position_top_n,
+        **kwargs,
+    )
+
+    responses = {}
+    for user_id, recommendations in results.items():
+        user_skill_ids = featurizer.user_skill_ids(users_data[user_id])
+        user_skills = featurizer.user_skill_names(user_skill_ids)
+        responses[user_id] = {
+            "certificates": {
+                "user_id": user_id,
+                "user_skills": user_skills,
+                "recommendations": [
+                    certificate_recommender.describe(cert, user_skill_ids)
+                    for cert in recommendations["certificates"]
+                ],
+            },
+            "positions": {
+                "user_id": user_id,
+                "user_skills": user_skills,
+                "recommendations": [
+                    positions_recommender.describe(position, user_skill_ids)
+                    for position in recommendations["positions"]
+                ],
+            },
+        }
+    return responses
@@ -0,0 +1,124 @@
+"""Recall and latency of candidate generation on a synthetic catalog.
+
+Usage: python benchmark_candidates.py [--items 100000] [--skills 2000]
+                                      [--users 200] [--top-n 100]
+
+Compares full scoring (every certificate scored) with scoring through the
+inverted index, and with the index treated as an approximate generator (MMR
+restricted to its candidates, as it would be for an ANN index), printing
+recall@top_n against full scoring and per-request latency.
+"""
+
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from certificates_recommender import CertificateRecommender
+
+
+def skill_popularity(n_skills):
+    # Zipf-like: a few skills are on most certificates and users
+    popularity = 1 / np.arange(1, n_skills + 1)
+    return popularity / popularity.sum()
+
+
+def synthetic_catalog(n_items, n_skills, rng):
+    # ~5 skills per certificate, like the real catalog
+    popularity = skill_popularity(n_skills)
+    return [
+        {
+            "id": idx + 1,
+            "provider": f"provider{rng.integers(50)}",
+            "skills": [
+                {"skill_id": int(skill_id), "skill_name": f"skill{skill_id}"}
+                for skill_id in rng.choice(
+                    n_skills, rng.integers(1, 10), replace=False, p=popularity
+                )
+            ],
+        }
+        for idx in range(n_items)
+    ]
+
+
+def user_vectors(n_users, n_skills, rng):
+    popularity = skill_popularity(n_skills)
+    vectors = np.zeros((n_users, n_skills))
+    for vector in vectors:
+        skills = rng.choice(n_skills, rng.integers(1, 15), replace=False, p=popularity)
+        vector[skills] = rng.random(len(skills))
+    return vectors
+
+
+def timed(recommender, vectors, top_n, diversity_lambda):
+    started = time.perf_counter()
+    results = [
+        [
+            rec["certificate_id"]
+            for rec in recommender.recommend(
+                vector, [], top_n=top_n, diversity_lambda=diversity_lambda
+            )
+        ]
+        for vector in vectors
+    ]
+    return results, (time.perf_counter() - started) / len(vectors)
+
+
+def recall(results, expected):
+    return np.mean(
+        [
+            len(set(got) & set(want)) / max(len(want), 1)
+            for got, want in zip(results, expected)
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--skills", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=100)
+    parser.add_argument("--diversity-lambda", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    catalog = synthetic_catalog(args.items, args.skills, rng)
+    skill_ids = list(range(args.skills))
+    vectors = user_vectors(args.users, args.skills, rng)
+
+    full = CertificateRecommender()
+    full.train(catalog, skill_ids=skill_ids, candidate_index=False)
+    indexed = CertificateRecommender()
+    indexed.train(catalog, skill_ids=skill_ids, candidate_index=True)
+
+    class Approximate:
+        """The inverted index posing as an approximate generator: selection
+        is restricted to its candidates, as it would be for an ANN index"""
+
+        exact = False
+        score = indexed.candidate_generator.score
+
+    approximate_model = copy.copy(indexed)
+    approximate_model.candidate_generator = Approximate()
+
+    expected, full_latency = timed(full, vectors, args.top_n, args.diversity_lambda)
+    exact, exact_latency = timed(indexed, vectors, args.top_n, args.diversity_lambda)
+    print(
+        f"{args.items} items, {args.skills} skills, {args.users} users, "
+        f"top {args.top_n}"
+    )
+    print(f"full scoring        {full_latency * 1000:8.2f} ms/request")
+    print(
+        f"inverted index      {exact_latency * 1000:8.2f} ms/request  "
+        f"recall {recall(exact, expected):.4f}"
+    )
+    approximate, approximate_latency = timed(
+        approximate_model, vectors, args.top_n, args.diversity_lambda
+    )
+    print(
+        f"  as approximate    {approximate_latency * 1000:8.2f} ms/request  "
+        f"recall {recall(approximate, expected):.4f}"
+    )
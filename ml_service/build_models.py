@@ -0,0 +1,62 @@
+"""Train both recommenders and write them as a model artifact.
+
+Usage: python build_models.py [--output models]
+
+Run out of band (e.g. after catalog changes or in the image build); app.py
+loads the artifact from MODEL_ARTIFACT_DIR at startup instead of fetching and
+training the catalogs itself, and running workers switch to a newly built one
+within WORKER_EVENTS_POLL_INTERVAL seconds.
+"""
+
+import argparse
+import os
+import time
+from typing import Tuple
+
+from dotenv import load_dotenv
+
+from catalog_loader import save_models, train_models
+from certificates_recommender import CertificateRecommender
+from data_fetcher import DataFetcher
+from feature_engineer import RecommenderFeaturizer
+from positions_recommender import PositionsRecommender
+from worker_events import WorkerEvents
+
+load_dotenv()
+
+
+def build_artifact(
+    directory: str,
+) -> Tuple[CertificateRecommender, PositionsRecommender]:
+    """Fetch the catalogs, train both recommenders and publish them to
+    directory, telling running workers to load them"""
+    events = WorkerEvents(
+        os.getenv("RECOMMENDATION_STORE_PATH", "recommendations.sqlite3")
+    )
+    since = events.last()
+    data_fetcher = DataFetcher(os.getenv("DATA_API_URL_HOST_DOCKER"))
+    skills = data_fetcher.get_all_skills()
+    featurizer = RecommenderFeaturizer(data_fetcher, skills)
+    certificate_recommender, positions_recommender = train_models(
+        data_fetcher, featurizer.skill_ids
+    )
+    save_models(
+        directory, certificate_recommender, positions_recommender, skills, since
+    )
+    events.publish("models")
+    return certificate_recommender, positions_recommender
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=os.getenv("MODEL_ARTIFACT_DIR", "models"))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    certificate_recommender, positions_recommender = build_artifact(args.output)
+    elapsed = time.perf_counter() - started
+    print(
+        f"Wrote certificates {certificate_recommender.model_version} and "
+        f"positions {positions_recommender.model_version} to {args.output} "
+        f"in {elapsed:.1f}s"
+    )
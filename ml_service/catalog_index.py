@@ -0,0 +1,73 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List
+
+
+def build_catalog_index(items: List[Dict]) -> Dict[int, Dict]:
+    """Index training items by id for response assembly.
+
+    Every field of an item other than "id" and "skills" is kept as is
+    (name, description, provider, ...). The skill list is flattened into
+    aligned "skill_ids" / "skill_names" lists so routes never call the
+    Express API to describe a recommendation.
+    """
+    index = {}
+    for item in items:
+        entry = {
+            key: value for key, value in item.items() if key not in ("id", "skills")
+        }
+        entry["skill_ids"] = [skill["skill_id"] for skill in item["skills"]]
+        entry["skill_names"] = [skill.get("skill_name") for skill in item["skills"]]
+        index[item["id"]] = entry
+    return index
+
+
+def catalog_items(index: Dict[int, Dict]) -> List[Dict]:
+    """Training items back from a catalog index (inverse of build_catalog_index)"""
+    items = []
+    for item_id, entry in index.items():
+        item = {
+            key: value
+            for key, value in entry.items()
+            if key not in ("skill_ids", "skill_names")
+        }
+        item["id"] = item_id
+        item["skills"] = [
+            {"skill_id": skill_id, "skill_name": name}
+            for skill_id, name in zip(entry["skill_ids"], entry["skill_names"])
+        ]
+        items.append(item)
+    return items
+
+
+def coincident_skills(entry: Dict, user_skill_ids: Iterable[int]) -> List[str]:
+    """Names of the item's skills the user already has"""
+    return [
+        name
+        for skill_id, name in zip(entry["skill_ids"], entry["skill_names"])
+        if skill_id in user_skill_ids
+    ]
+
+
+def catalog_version(items: List[Dict]) -> str:
+    """Short content hash of the items, used as model version.
+
+    Independent of item and skill order, so two processes that fetched the
+    same catalog agree on the version.
+    """
+    content = sorted(
+        json.dumps(
+            {**item, "skills": sorted(item["skills"], key=lambda s: s["skill_id"])},
+            sort_keys=True,
+            default=str,
+        )
+        for item in items
+    )
+    return hashlib.sha1(json.dumps(content).encode()).hexdigest()[:12]
+
+
+def edit_version(model_version: str, edit: Dict) -> str:
+    """Model version after an incremental edit: a hash of the previous
+    version and the edit, so processes applying the same edits agree"""
+    content = json.dumps([model_version, edit], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode()).hexdigest()[:12]
@@ -0,0 +1,198 @@
+import copy
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from certificates_recommender import CertificateRecommender
+from data_fetcher import DataFetcher
+from model_artifacts import publish_version, resolve_version
+from positions_recommender import PositionsRecommender
+
+
+def load_certificates(
+    data_fetcher: DataFetcher, certificate_ids: Optional[List[int]] = None
+) -> List[Dict]:
+    """Certificates with their skills and response metadata, ready for train().
+
+    With certificate_ids only those certificates are returned (the ones that
+    still exist), with their skills fetched one by one.
+    """
+    certificates = data_fetcher.get_all_certificates()
+    if certificate_ids is None:
+        certificate_skills = data_fetcher.get_all_certificate_skills(
+            [cert["certificate_id"] for cert in certificates]
+        )
+    else:
+        certificates = [
+            cert for cert in certificates if cert["certificate_id"] in certificate_ids
+        ]
+        certificate_skills = {
+            cert["certificate_id"]: data_fetcher.get_certificate_skills(
+                cert["certificate_id"]
+            )
+            for cert in certificates
+        }
+    return [
+        {
+            "id": cert["certificate_id"],
+            "skills": certificate_skills[cert["certificate_id"]],
+            "provider": cert.get("provider"),
+            "name": cert.get("certificate_name"),
+            "description": cert.get("certificate_desc"),
+            "estimated_time": cert.get("certificate_estimated_time"),
+            "level": cert.get("certificate_level"),
+        }
+        for cert in certificates
+    ]
+
+
+def load_positions(
+    data_fetcher: DataFetcher, position_ids: Optional[List[int]] = None
+) -> List[Dict]:
+    """Available positions with their skills and response metadata, ready for train().
+
+    With position_ids only those positions are returned (the ones that are
+    still available), with their skills fetched one by one.
+    """
+    positions = data_fetcher.get_all_positions()
+    if position_ids is None:
+        position_skills = data_fetcher.get_all_position_skills(
+            [position["position_id"] for position in positions]
+        )
+    else:
+        positions = [
+            position
+            for position in positions
+            if position["position_id"] in position_ids
+        ]
+        position_skills = {
+            position["position_id"]: data_fetcher.get_position_skills(
+                position["position_id"]
+            )
+            for position in positions
+        }
+    return [
+        {
+            "id": position["position_id"],
+            "skills": position_skills[position["position_id"]],
+            "name": position.get("position_name"),
+            "description": position.get("position_desc"),
+        }
+        for position in positions
+    ]
+
+
+def train_models(
+    data_fetcher: DataFetcher, skill_ids: Optional[List[int]] = None
+) -> Tuple[CertificateRecommender, PositionsRecommender]:
+    """Fetch both catalogs and train a fresh recommender for each, with
+    skill_ids (the featurizer's vocabulary) as the shared column order"""
+    certificate_recommender = CertificateRecommender()
+    certificate_recommender.train(load_certificates(data_fetcher), skill_ids=skill_ids)
+
+    positions_recommender = PositionsRecommender()
+    positions_recommender.train(load_positions(data_fetcher), skill_ids=skill_ids)
+
+    return certificate_recommender, positions_recommender
+
+
+def refresh_certificates(
+    data_fetcher: DataFetcher,
+    recommender: CertificateRecommender,
+    certificate_ids: List[int],
+) -> CertificateRecommender:
+    """Copy of recommender with the given certificates re-read from the API:
+    upserted if they exist, removed otherwise. The original is untouched."""
+    updated = copy.copy(recommender)
+    certificates = {
+        cert["id"]: cert for cert in load_certificates(data_fetcher, certificate_ids)
+    }
+    for cert_id in certificate_ids:
+        if cert_id in certificates:
+            updated.upsert(certificates[cert_id])
+        else:
+            updated.remove(cert_id)
+    return updated
+
+
+def refresh_positions(
+    data_fetcher: DataFetcher,
+    recommender: PositionsRecommender,
+    position_ids: List[int],
+) -> PositionsRecommender:
+    """Copy of recommender with the given positions re-read from the API:
+    upserted if still available, removed otherwise. The original is untouched."""
+    updated = copy.copy(recommender)
+    positions = {
+        position["id"]: position
+        for position in load_positions(data_fetcher, position_ids)
+    }
+    for position_id in position_ids:
+        if position_id in positions:
+            updated.upsert(positions[position_id])
+        else:
+            updated.remove(position_id)
+    return updated
+
+
+def has_models(directory: Optional[str]) -> bool:
+    """True if directory holds artifacts written by save_models()"""
+    if not directory:
+        return False
+    return all(
+        os.path.exists(os.path.join(directory, path))
+        for path in (
+            "certificates/meta.json",
+            "positions/meta.json",
+            "skills.json",
+            "events.json",
+        )
+    )
+
+
+def save_models(
+    directory: str,
+    certificate_recommender: CertificateRecommender,
+    positions_recommender: PositionsRecommender,
+    skills: List[Dict],
+    since: int = 0,
+) -> str:
+    """Persist both trained recommenders and the skill list for the featurizer
+    as a new version of directory (see publish_version), so readers switch
+    to all three at once. since is the last WorkerEvents event the models
+    include. Returns the version's path."""
+
+    def write(version: str) -> None:
+        certificate_recommender.save(os.path.join(version, "certificates"))
+        positions_recommender.save(os.path.join(version, "positions"))
+        with open(os.path.join(version, "skills.json"), "w") as f:
+            json.dump(skills, f, default=str)
+        with open(os.path.join(version, "events.json"), "w") as f:
+            json.dump({"since": since}, f)
+
+    return publish_version(directory, write)
+
+
+def load_models(
+    directory: str, mmap: bool = True
+) -> Tuple[CertificateRecommender, PositionsRecommender, List[Dict], int]:
+    """Recommenders, skill list and since written by save_models(), all from
+    the same version even if a new one is published meanwhile"""
+    while True:
+        version = resolve_version(directory)
+        try:
+            certificate_recommender = CertificateRecommender.load(
+                os.path.join(version, "certificates"), mmap=mmap
+            )
+            positions_recommender = PositionsRecommender.load(
+                os.path.join(version, "positions"), mmap=mmap
+            )
+            with open(os.path.join(version, "skills.json")) as f:
+                skills = json.load(f)
+            with open(os.path.join(version, "events.json")) as f:
+                since = json.load(f)["since"]
+            return certificate_recommender, positions_recommender, skills, since
+        except FileNotFoundError:
+            # Pruned by newer publishes while loading; load the current one
+            if resolve_version(directory) == version:
+                raise
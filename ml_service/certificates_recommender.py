@@ -1,99 +1,154 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import normalize
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfTransformer
+import scipy.sparse as sp
+from typing import List, Dict, Optional
+from skill_item_recommender import SkillItemRecommender
 
 
-class CertificateRecommender:
+class CertificateRecommender(SkillItemRecommender):
+    id_field = "certificate_id"
+
     def __init__(self):
-        self.skill_matrix = None
-        self.cert_sim_matrix = None
-        self.certificate_ids = []
-        self.skill_ids = []
+        super().__init__()
         self.certificate_providers = {}
+        self.provider_code_index = {}
+        self.provider_codes = None
 
-    def train(self, certificates: List[Dict]):
-        """Build skill matrix for all certificates"""
-        self.skill_ids = list(
-            {skill["skill_id"] for cert in certificates for skill in cert["skills"]}
+    def _fit_items(self, certificates: List[Dict]):
+        self.certificate_providers = {
+            cert["id"]: cert.get("provider") for cert in certificates
+        }
+        # Provider of each row as an integer code (-1 for none) for vectorized bonuses
+        self.provider_code_index = {}
+        self.provider_codes = np.array(
+            [
+                (
+                    self.provider_code_index.setdefault(
+                        cert.get("provider"), len(self.provider_code_index)
+                    )
+                    if cert.get("provider")
+                    else -1
+                )
+                for cert in certificates
+            ],
+            dtype=np.int64,
         )
 
-        self.certificate_ids = [cert["id"] for cert in certificates]
+    def _upsert_item(self, idx: int, certificate: Dict):
+        if idx == len(self.provider_codes):
+            self.provider_codes = np.append(self.provider_codes, -1)
+        else:
+            self.provider_codes = self.provider_codes.copy()
+
+        provider = certificate.get("provider")
         self.certificate_providers = {
-            cert["id"]: cert.get("provider") for cert in certificates
+            **self.certificate_providers,
+            certificate["id"]: provider,
+        }
+        if provider and provider not in self.provider_code_index:
+            self.provider_code_index = {
+                **self.provider_code_index,
+                provider: len(self.provider_code_index),
+            }
+        self.provider_codes[idx] = (
+            self.provider_code_index[provider] if provider else -1
+        )
+
+    def _remove_item(self, idx: int, cert_id: int):
+        self.certificate_providers = {
+            key: value
+            for key, value in self.certificate_providers.items()
+            if key != cert_id
+        }
+        self.provider_codes = self.provider_codes.copy()
+        self.provider_codes[idx] = -1
+
+    def _extra_arrays(self) -> Dict[str, np.ndarray]:
+        return {"provider_codes": self.provider_codes}
+
+    def _extra_meta(self) -> Dict:
+        return {"providers": list(self.provider_code_index)}
+
+    def _load_extra(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        self.certificate_providers = {
+            cert_id: entry.get("provider") for cert_id, entry in self.catalog.items()
+        }
+        self.provider_code_index = {
+            provider: code for code, provider in enumerate(meta["providers"])
         }
+        self.provider_codes = arrays["provider_codes"]
 
-        self.skill_matrix = np.zeros((len(certificates), len(self.skill_ids)))
-        skill_index = {skill_id: idx for idx, skill_id in enumerate(self.skill_ids)}
-        for idx, cert in enumerate(certificates):
-            for skill in cert["skills"]:
-                skill_id = skill["skill_id"]
-                if skill_id in skill_index:
-                    self.skill_matrix[idx, skill_index[skill_id]] = 1
+    def score(
+        self,
+        user_vector: np.ndarray,
+        existing_providers: List[str] = None,
+        provider_bonus: float = 0.125,
+    ) -> np.ndarray:
+        """Similarity of a user to every certificate, plus the provider bonus"""
+        similarities = super().score(user_vector)
+        similarities[self._provider_mask(existing_providers)] += provider_bonus
+        return similarities
 
-        transformer = TfidfTransformer(norm="l2", use_idf=True)
-        self.skill_matrix = transformer.fit_transform(self.skill_matrix).toarray()
-        # Compute certificate similarity matrix
-        self.cert_sim_matrix = cosine_similarity(self.skill_matrix)
+    def score_many(
+        self,
+        user_matrix: sp.spmatrix,
+        existing_providers: List[List[str]],
+        provider_bonus: float = 0.125,
+    ) -> np.ndarray:
+        """score() for a users x skills matrix in one sparse product"""
+        similarities = super().score_many(user_matrix)
+        for row, providers in enumerate(existing_providers):
+            similarities[row, self._provider_mask(providers)] += provider_bonus
+        return similarities
+
+    def _provider_mask(self, existing_providers: Optional[List[str]]) -> np.ndarray:
+        codes = [
+            self.provider_code_index[provider]
+            for provider in existing_providers or []
+            if provider in self.provider_code_index
+        ]
+        return np.isin(self.provider_codes, codes)
+
+    def providers_of(self, cert_ids: List[int]) -> List[str]:
+        """Distinct providers of the given certificates"""
+        return list(
+            set(
+                self.certificate_providers[cert_id]
+                for cert_id in cert_ids
+                if cert_id in self.certificate_providers
+            )
+        )
+
+    def describe_item(self, info: Dict) -> Dict:
+        return {
+            "certificate_name": info["name"],
+            "certificate_desc": info["description"],
+            "provider": info["provider"],
+            "certificate_estimated_time": info["estimated_time"],
+            "certificate_level": info["level"],
+        }
 
     def recommend(
         self,
         user_vector: np.ndarray,
         exclude_cert_ids: List[int],
-        existing_providers: List[int] = None,
+        existing_providers: List[str] = None,
         provider_bonus: float = 0.125,
         top_n: int = 100,
         diversity_lambda: float = 0.5,
+        candidate_pool: Optional[int] = None,
     ) -> List[Dict]:
         """Get top certificate recommendations"""
-        if self.skill_matrix is None:
-            raise ValueError("Model not trained. Call train() first.")
-
-        # Calculate similarities
-        similarities = cosine_similarity([user_vector], self.skill_matrix)[0]
-
-        if existing_providers:
-            for idx in range(len(similarities)):
-                cert_id = self.certificate_ids[idx]
-                cert_provider = self.certificate_providers.get(cert_id)
-                if cert_provider and cert_provider in existing_providers:
-                    similarities[idx] += provider_bonus
-
-        candidate_indices = [
-            idx
-            for idx, cert_id in enumerate(self.certificate_ids)
-            if cert_id not in exclude_cert_ids
-        ]
-        recommendations = []
-        selected_indices = []
-
-        while len(recommendations) < top_n and candidate_indices:
-            best_mmr = -np.inf
-            best_idx = None
-            for idx in candidate_indices:
-                current_sim = similarities[idx]
-                if not selected_indices:
-                    mmr = diversity_lambda * current_sim
-                else:
-                    max_sim = np.max(self.cert_sim_matrix[idx, selected_indices])
-                    mmr = (diversity_lambda * current_sim) - (
-                        (1 - diversity_lambda) * max_sim
-                    )
-                if mmr > best_mmr:
-                    best_mmr = mmr
-                    best_idx = idx
-            if best_idx is None:
-                break
-            cert_id = self.certificate_ids[best_idx]
-            recommendations.append(
-                {
-                    "certificate_id": cert_id,
-                    "similarity_score": float(similarities[best_idx]),
-                    "mmr_score": float(best_mmr),
-                }
-            )
-            selected_indices.append(best_idx)
-            candidate_indices.remove(best_idx)
-
-        return recommendations
+        similarities, generated = super().generated_scores(user_vector)
+        bonus = self._provider_mask(existing_providers)
+        similarities[bonus] += provider_bonus
+        if generated is not None:
+            bonus[generated] = True
+            generated = np.flatnonzero(bonus)
+        return self.select(
+            similarities,
+            exclude_cert_ids,
+            top_n,
+            diversity_lambda,
+            candidate_pool,
+            generated,
+        )
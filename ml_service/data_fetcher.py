@@ -1,64 +1,180 @@
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional
+from urllib3.util.retry import Retry
 
 load_dotenv()
 
+USER_DATA_ENDPOINTS = ["skills", "certificates", "positions", "goals"]
+# Upstream statuses worth retrying (gateway errors while the API restarts)
+RETRY_STATUSES = [502, 503, 504]
+
 
 class DataFetcher:
-    def __init__(self, api_base: str):
+    def __init__(
+        self,
+        api_base: str,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        batch_workers: Optional[int] = None,
+    ):
         self.base_url = api_base
         self.headers = {
             "admin-password": os.getenv("ADMIN_PASSWORD_ML"),
         }
+        self.timeout = (
+            connect_timeout or float(os.getenv("DATA_API_CONNECT_TIMEOUT", 3.05)),
+            read_timeout or float(os.getenv("DATA_API_READ_TIMEOUT", 30)),
+        )
+        retries = (
+            retries if retries is not None else int(os.getenv("DATA_API_RETRIES", 2))
+        )
+        pool_size = pool_size or int(os.getenv("DATA_API_POOL_SIZE", 16))
+        batch_workers = batch_workers or int(os.getenv("DATA_API_BATCH_WORKERS", 4))
+
+        # One keep-alive connection pool shared by every call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size + batch_workers,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.2,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=["GET"],
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Enough workers to fetch every user endpoint of a few users at once
+        self.executor = ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="data-fetcher"
+        )
+        # Batch fetches get their own, smaller pool so a large batch or
+        # precompute run never queues ahead of live per-user requests
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=batch_workers, thread_name_prefix="data-fetcher-batch"
+        )
+
+    def _get(self, path: str) -> requests.Response:
+        """GET a path of the Express API on the pooled session"""
+        return self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
 
     def get_user_data(self, user_id: int) -> Dict:
-        """Fetch all relevant user data from Express API"""
-        endpoints = ["skills", "certificates", "positions", "goals"]
+        """Fetch all relevant user data from Express API.
+
+        The four endpoints are requested concurrently, so the call costs about
+        one round trip.
+        """
+        responses = self.executor.map(
+            lambda endpoint: self._get(f"/ml-user-data/{endpoint}/{user_id}"),
+            USER_DATA_ENDPOINTS,
+        )
 
         data = {}
-        for endpoint in endpoints:
-            response = requests.get(
-                f"{self.base_url}/ml-user-data/{endpoint}/{user_id}",
-                headers=self.headers,
-            )
+        for endpoint, response in zip(USER_DATA_ENDPOINTS, responses):
             if response.status_code == 200:
                 data[endpoint] = response.json()
 
         return data
 
+    def get_users_data(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """get_user_data for many users, fetched on the batch pool"""
+        requests_to_send = [
+            (user_id, endpoint)
+            for user_id in user_ids
+            for endpoint in USER_DATA_ENDPOINTS
+        ]
+        responses = self.batch_executor.map(
+            lambda pair: self._get(f"/ml-user-data/{pair[1]}/{pair[0]}"),
+            requests_to_send,
+        )
+
+        data = {user_id: {} for user_id in user_ids}
+        for (user_id, endpoint), response in zip(requests_to_send, responses):
+            if response.status_code == 200:
+                data[user_id][endpoint] = response.json()
+
+        return data
+
+    def get_all_user_ids(self) -> List[int]:
+        """Ids of every user, for batch jobs"""
+        response = self._get("/ml-user-data/all_users")
+        return response.json() if response.status_code == 200 else []
+
     def get_all_certificates(self) -> List[Dict]:
         """Fetch all available certificates"""
-        response = requests.get(
-            f"{self.base_url}/general/certificates", headers=self.headers
-        )
+        response = self._get("/general/certificates")
         return response.json() if response.status_code == 200 else []
 
     def get_certificate_skills(self, certificate_id: int) -> List[int]:
         """Get skills associated with a certificate"""
-        response = requests.get(
-            f"{self.base_url}/general/certificates/{certificate_id}/skills",
-            headers=self.headers,
-        )
+        response = self._get(f"/general/certificates/{certificate_id}/skills")
         return response.json() if response.status_code == 200 else []
 
+    def get_all_certificate_skills(
+        self, certificate_ids: List[int]
+    ) -> Dict[int, List[Dict]]:
+        """Get the skills of every certificate in one call, keyed by certificate.
+
+        Falls back to one get_certificate_skills call per certificate if the
+        bulk endpoint is unavailable.
+        """
+        response = self._get("/general/certificates-skills")
+        if response.status_code != 200:
+            return {
+                certificate_id: self.get_certificate_skills(certificate_id)
+                for certificate_id in certificate_ids
+            }
+
+        return self._group_skills(response.json(), "certificate_id", certificate_ids)
+
     def get_all_skills(self) -> List[Dict]:
         """Fetch all skills with names and IDs"""
-        response = requests.get(f"{self.base_url}/general/skills", headers=self.headers)
+        response = self._get("/general/skills")
         return response.json() if response.status_code == 200 else []
 
     def get_all_positions(self) -> List[Dict]:
         """Fetch all available positions"""
-        response = requests.get(
-            f"{self.base_url}/ml-user-data/all_positions", headers=self.headers
-        )
+        response = self._get("/ml-user-data/all_positions")
         return response.json() if response.status_code == 200 else []
 
     def get_position_skills(self, position_id: int) -> List[int]:
         """Get skills associated with a position"""
-        response = requests.get(
-            f"{self.base_url}/ml-user-data/position/{position_id}",
-            headers=self.headers,
-        )
+        response = self._get(f"/ml-user-data/position/{position_id}")
         return response.json() if response.status_code == 200 else []
+
+    def get_all_position_skills(self, position_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Get the skills of every available position in one call, keyed by position.
+
+        Falls back to one get_position_skills call per position if the bulk
+        endpoint is unavailable.
+        """
+        response = self._get("/ml-user-data/all_positions_skills")
+        if response.status_code != 200:
+            return {
+                position_id: self.get_position_skills(position_id)
+                for position_id in position_ids
+            }
+
+        return self._group_skills(response.json(), "position_id", position_ids)
+
+    def _group_skills(
+        self, edges: List[Dict], key: str, item_ids: List[int]
+    ) -> Dict[int, List[Dict]]:
+        """Group (item, skill) rows into the per-item format of the single endpoints"""
+        grouped = {item_id: [] for item_id in item_ids}
+        for edge in edges:
+            if edge[key] in grouped:
+                grouped[edge[key]].append(
+                    {"skill_id": edge["skill_id"], "skill_name": edge["skill_name"]}
+                )
+        return grouped
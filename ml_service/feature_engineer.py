@@ -1,11 +1,33 @@
-from typing import Dict, List
+import hashlib
+import json
+from typing import Dict, List, Optional, Set, Tuple
 import numpy as np
-from sklearn.preprocessing import normalize
+import scipy.sparse as sp
 from data_fetcher import DataFetcher
+from skill_matrix import skill_column_lookup, skill_vocabulary
+from skill_matcher import SkillMatcher
+
+
+def noUser(user_data: Dict) -> bool:
+    """True if the Express API returned nothing for any user endpoint"""
+    all_empty = all(
+        (
+            not user_data[key] or all(not v for v in user_data[key].values())
+            if isinstance(user_data[key], dict)
+            else not user_data[key]
+        )
+        for key in user_data
+    )
+
+    if all_empty:
+        return True
+
+    return False
 
 
 class RecommenderFeaturizer:
-    def __init__(self, data_fetcher: DataFetcher):
+    def __init__(self, data_fetcher: DataFetcher, skills: Optional[List[Dict]] = None):
+        """skills skips the skill fetch, e.g. when loaded from a model artifact"""
         self.skill_weights = {
             "current_skills": 0.5,
             "goal_skills": 2.0,
@@ -19,11 +41,24 @@ class RecommenderFeaturizer:
         }
         self.repetition_bonus = 0.15
         self.data_fetcher = data_fetcher
-        self.skill_name_to_id = self._load_skill_mappings()
-
-    def _load_skill_mappings(self) -> Dict[str, int]:
+        self.skill_names = {}
+        self.skill_name_to_id = self._load_skill_mappings(skills)
+        self.skill_matcher = SkillMatcher(self.skill_name_to_id)
+        # Shared vocabulary: the column order of user vectors and of every
+        # model's skill matrix (pass skill_ids to their train())
+        self.skill_ids = skill_vocabulary(self.skill_names)
+        self.skill_columns = skill_column_lookup(self.skill_ids)
+        self.vocabulary_version = hashlib.sha1(
+            json.dumps(sorted(self.skill_names.items())).encode()
+        ).hexdigest()[:12]
+
+    def _load_skill_mappings(
+        self, skills: Optional[List[Dict]] = None
+    ) -> Dict[str, int]:
         """Load skill mappings from the API"""
-        skills = self.data_fetcher.get_all_skills()
+        if skills is None:
+            skills = self.data_fetcher.get_all_skills()
+        self.skill_names = {skill["skill_id"]: skill["skill_name"] for skill in skills}
         skill_name_to_id = {}
         for skill in skills:
             name = skill.get("skill_name", "").lower()
@@ -33,20 +68,125 @@ class RecommenderFeaturizer:
         return skill_name_to_id
 
     def _extract_skills_from_text(self, text: str) -> List[int]:
-        tokens = text.lower().split()
-        found_skills = set()
-        # Check single words and n-grams (e.g., "java development")
-        for n in [1, 2, 3]:  # Check 1, 2, and 3-word phrases
-            for i in range(len(tokens) - n + 1):
-                phrase = " ".join(tokens[i : i + n])
-                if phrase in self.skill_name_to_id:
-                    found_skills.add(self.skill_name_to_id[phrase])
-        return list(found_skills)
-
-    def create_user_vector(self, user_data: Dict, all_skills: List[int]) -> np.ndarray:
-        """Create weighted skill vector for user"""
-        skill_vector = np.zeros(len(all_skills))
-        skill_index = {skill_id: idx for idx, skill_id in enumerate(all_skills)}
+        # Skill names of any length (e.g., "java development"), cached per text
+        return list(self.skill_matcher.match(text))
+
+    def owned_certificate_ids(self, user_data: Dict) -> List[int]:
+        """Certificates the user already holds (excluded from recommendations)"""
+        certificates_data = user_data.get("certificates", {})
+        if (
+            isinstance(certificates_data, dict)
+            and "certificate_id" in certificates_data
+        ):
+            return certificates_data["certificate_id"]
+        return [c["certificate_id"] for c in certificates_data if "certificate_id" in c]
+
+    def owned_position_ids(self, user_data: Dict) -> List[int]:
+        """Positions the user already holds (excluded from recommendations)"""
+        position_data = user_data.get("positions", {})
+        if isinstance(position_data, dict) and "position_id" in position_data:
+            return position_data["position_id"]
+        return [p["position_id"] for p in position_data if "position_id" in p]
+
+    def user_skill_ids(self, user_data: Dict) -> Set[int]:
+        """Skills the user has from their profile, certificates and positions"""
+        user_skill_ids = set()
+        user_skill_ids.update(user_data.get("skills", {}).get("skills_id", []))
+        user_skill_ids.update(user_data.get("certificates", {}).get("skills_id", []))
+        user_skill_ids.update(user_data.get("positions", {}).get("skills_id", []))
+        return user_skill_ids
+
+    def user_skill_names(self, user_skill_ids: Set[int]) -> List[str]:
+        """Names of the given skills, in skill id order"""
+        return [
+            self.skill_names[skill_id]
+            for skill_id in sorted(user_skill_ids)
+            if skill_id in self.skill_names
+        ]
+
+    def create_user_matrix(
+        self,
+        users_data: List[Dict],
+        all_skills: Optional[List[int]] = None,
+        skill_columns: Optional[np.ndarray] = None,
+    ) -> sp.csr_matrix:
+        """Featurize many users at once into a users x skills matrix.
+
+        Row i is create_user_vector(users_data[i], all_skills).
+        """
+        return sp.csr_matrix(self._user_rows(users_data, all_skills, skill_columns))
+
+    def create_user_vector(
+        self,
+        user_data: Dict,
+        all_skills: Optional[List[int]] = None,
+        skill_columns: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Create weighted skill vector for user
+
+        Columns follow the shared vocabulary (self.skill_ids) unless
+        all_skills is given; skill_columns is skill_column_lookup(all_skills)
+        and is derived from it when omitted.
+        """
+        return self._user_rows([user_data], all_skills, skill_columns)[0]
+
+    def _user_rows(
+        self,
+        users_data: List[Dict],
+        all_skills: List[int],
+        skill_columns: Optional[np.ndarray],
+    ) -> np.ndarray:
+        """Dense, L2-normalized users x skills matrix in one vectorized pass.
+
+        Every skill list of every user (a "source") is flattened into one id
+        array, repeats are counted per (source, column) with one np.unique,
+        and the weights are summed into cells with one np.bincount. Sources
+        are numbered in order, so contributions to a cell are added in the
+        same order as adding them one at a time.
+        """
+        if all_skills is None:
+            all_skills, skill_columns = self.skill_ids, self.skill_columns
+        elif skill_columns is None:
+            skill_columns = skill_column_lookup(all_skills)
+        n_skills = len(all_skills)
+
+        source_rows, source_weights, source_ids = [], [], []
+        for row, user_data in enumerate(users_data):
+            for skill_ids, base_weight in self._skill_sources(user_data):
+                source_rows.append(row)
+                source_weights.append(base_weight)
+                source_ids.append(np.asarray(skill_ids, dtype=np.int64))
+
+        matrix = np.zeros((len(users_data), n_skills))
+        if source_ids:
+            skill_ids = np.concatenate(source_ids)
+            sources = np.repeat(
+                np.arange(len(source_ids)), [len(ids) for ids in source_ids]
+            )
+            known = (skill_ids >= 0) & (skill_ids < len(skill_columns))
+            columns = skill_columns[skill_ids[known]]
+            sources = sources[known][columns >= 0]
+            columns = columns[columns >= 0]
+
+            keys, counts = np.unique(sources * n_skills + columns, return_counts=True)
+            sources, columns = np.divmod(keys, n_skills)
+            # base weight per distinct skill plus the bonus for every repeat
+            weights = np.asarray(source_weights)[sources] + self.repetition_bonus * (
+                counts - 1
+            )
+            cells = np.asarray(source_rows)[sources] * n_skills + columns
+            matrix = np.bincount(cells, weights=weights, minlength=matrix.size).reshape(
+                matrix.shape
+            )
+
+        # Same row norms as sklearn.preprocessing.normalize; empty rows stay 0
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+        norms[norms == 0] = 1
+        return matrix / norms[:, None]
+
+    def _skill_sources(self, user_data: Dict) -> List[Tuple[List[int], float]]:
+        """The user's skill lists, each with the base weight it contributes"""
+        sources = []
 
         def extract_skill_ids(items):
             if not items:
@@ -69,96 +209,38 @@ class RecommenderFeaturizer:
             if isinstance(skills_data, dict)
             else extract_skill_ids(skills_data)
         )
-        self._add_skills(
-            skill_vector,
-            skill_index,
-            current_skills,
-            self.skill_weights["current_skills"],
-        )
+        sources.append((current_skills, self.skill_weights["current_skills"]))
 
-        # Goal skills: only add if nested "skills" are provided
+        # Goal skills: skills named in each goal's description, weighted by
+        # priority; every goal re-adds the skills of the goals before it
         goal_skills = []
         if isinstance(user_data.get("goals"), list):
             for goal in user_data.get("goals", []):
-                desc_skills = self._extract_skills_from_text(goal.get("goal_desc", ""))
-                goal_skills.extend(desc_skills)
+                goal_skills.extend(
+                    self._extract_skills_from_text(goal.get("goal_desc", ""))
+                )
                 priority = goal.get("priority", goal.get("goal_priority", "Low"))
                 multiplier = self.priority_bonus.get(priority, 1.0)
-                adjusted_weight = self.skill_weights["goal_skills"] * multiplier
-
-                self._add_skills(
-                    skill_vector,
-                    skill_index,
-                    goal_skills,
-                    adjusted_weight,
+                sources.append(
+                    (list(goal_skills), self.skill_weights["goal_skills"] * multiplier)
                 )
 
         # Positions
         if isinstance(user_data.get("positions"), dict):
-            position_data = user_data.get("positions", {})
-            position_skills = (
-                position_data.get("skills_id", [])
-                if isinstance(position_data, dict)
-                else []
-            )
-            if not position_skills:
-                for position in position_data:  # if it's a list
-                    if isinstance(position, dict) and "skills_id" in position:
-                        position_skills.extend(
-                            extract_skill_ids(position.get("skills_id", []))
-                        )
-                    elif isinstance(position, dict) and "skills" in position:
-                        position_skills.extend(
-                            extract_skill_ids(position.get("skills", []))
-                        )
-            self._add_skills(
-                skill_vector,
-                skill_index,
-                position_skills,
-                self.skill_weights["position_skills"],
+            sources.append(
+                (
+                    user_data["positions"].get("skills_id", []),
+                    self.skill_weights["position_skills"],
+                )
             )
 
         # Certificates
         if isinstance(user_data.get("certificates"), dict):
-            cert_data = user_data.get("certificates", {})
-            cert_skills = (
-                cert_data.get("skills_id", []) if isinstance(cert_data, dict) else []
-            )
-            if not cert_skills:
-                for cert in cert_data:
-                    cert_skills.extend(cert.get("skills_id", []))
-            self._add_skills(
-                skill_vector,
-                skill_index,
-                cert_skills,
-                self.skill_weights["certificate_skills"],
+            sources.append(
+                (
+                    user_data["certificates"].get("skills_id", []),
+                    self.skill_weights["certificate_skills"],
+                )
             )
 
-        if np.any(skill_vector):
-            return normalize([skill_vector])[0]
-
-        return skill_vector
-
-    def _count_skills(self, skills: List[int]) -> Dict[int, int]:
-        """Count occurrences of each skill ID"""
-        skill_counts = {}
-        for skill_id in skills:
-            if skill_id in skill_counts:
-                skill_counts[skill_id] += 1
-            else:
-                skill_counts[skill_id] = 1
-        return skill_counts
-
-    def _add_skills(
-        self,
-        vector: np.ndarray,
-        skill_index: Dict,
-        skills: List[int],
-        base_weight: float,
-    ):
-        """Helper method to add skills to vector"""
-        skill_counts = self._count_skills(skills)
-        for skill_id, count in skill_counts.items():
-            total_weight = base_weight + (self.repetition_bonus * (count - 1))
-            if skill_id in skill_index:
-                vector[skill_index[skill_id]] += total_weight
+        return sources
@@ -0,0 +1,130 @@
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+# Default size of the pre-filtered candidate pool, as a multiple of top_n
+POOL_SIZE_FACTOR = 10
+
+
+def mmr_rerank(
+    relevance: np.ndarray,
+    candidates: np.ndarray,
+    similarity_row: Callable[[int, np.ndarray], np.ndarray],
+    top_n: int,
+    diversity_lambda: float = 0.5,
+    candidate_pool: Optional[int] = None,
+    exact: bool = True,
+    rest: Optional[np.ndarray] = None,
+) -> List[Tuple[int, float]]:
+    """Greedy Maximal Marginal Relevance selection.
+
+    Keeps a running "max similarity to the selected set" for every candidate,
+    so each pick costs one np.maximum over the candidates instead of a scan of
+    the similarity matrix for every (candidate, selected) pair.
+
+    relevance: similarity of every item to the query (indexed by item).
+    candidates: item indices allowed in the result, in ascending order so ties
+        resolve to the lowest index.
+    similarity_row: (item_idx, candidates) -> similarity of item_idx to each
+        candidate.
+    candidate_pool: if set, only the candidate_pool most relevant candidates
+        enter the MMR stage.
+    rest: further allowed items, all with relevance 0 (e.g. the ones an exact
+        candidate generator left out). None of them can score above 0, so they
+        are only considered, by rerunning over all, once no pick from
+        candidates scores above 0.
+
+    Quality trade-off of candidate_pool: similarities are non-negative and
+    0 <= diversity_lambda <= 1, so no item left out of the pool can score more
+    than diversity_lambda * (best relevance left out). While every pick beats
+    that bound the result is identical to running over all candidates. With
+    exact=True the pool is doubled and the selection rerun whenever a pick
+    falls to the bound; with exact=False the pool result is returned as is.
+
+    Returns a list of (item_idx, mmr_score) in selection order.
+    """
+    candidates = np.asarray(candidates, dtype=np.intp)
+    if rest is not None and rest.size:
+        top_n = min(top_n, candidates.size + rest.size)
+        # Best score any item of rest can reach
+        floor = 0.0
+    else:
+        top_n = min(top_n, candidates.size)
+        floor = None
+    if top_n <= 0:
+        return []
+
+    pool_size = None if candidate_pool is None else max(candidate_pool, top_n)
+    while pool_size is not None and pool_size < candidates.size:
+        pool, bound = _top_pool(relevance, candidates, pool_size, diversity_lambda)
+        selected = _greedy_select(
+            relevance,
+            pool,
+            similarity_row,
+            top_n,
+            diversity_lambda,
+            # bound >= 0, so with exact it covers rest as well
+            min_score=bound if exact else floor,
+        )
+        if len(selected) == top_n:
+            return selected
+        pool_size *= 2
+
+    selected = _greedy_select(
+        relevance, candidates, similarity_row, top_n, diversity_lambda, floor
+    )
+    if floor is None or len(selected) == top_n:
+        return selected
+    return _greedy_select(
+        relevance,
+        np.union1d(candidates, rest),
+        similarity_row,
+        top_n,
+        diversity_lambda,
+    )
+
+
+def _top_pool(
+    relevance: np.ndarray,
+    candidates: np.ndarray,
+    pool_size: int,
+    diversity_lambda: float,
+) -> Tuple[np.ndarray, float]:
+    """Most relevant candidates (kept in index order) and the MMR upper bound
+    of everything left out"""
+    candidate_relevance = relevance[candidates]
+    order = np.argpartition(candidate_relevance, -pool_size)
+    pool = np.sort(order[-pool_size:])
+    bound = diversity_lambda * float(candidate_relevance[order[:-pool_size]].max())
+    return candidates[pool], bound
+
+
+def _greedy_select(
+    relevance: np.ndarray,
+    candidates: np.ndarray,
+    similarity_row: Callable[[int, np.ndarray], np.ndarray],
+    top_n: int,
+    diversity_lambda: float,
+    min_score: Optional[float] = None,
+) -> List[Tuple[int, float]]:
+    """Pick up to top_n candidates, stopping early once the best score is not
+    above min_score"""
+    weighted_relevance = diversity_lambda * relevance[candidates]
+    max_sim = np.zeros(candidates.size)
+    available = np.ones(candidates.size, dtype=bool)
+    scores = np.empty(candidates.size)
+
+    selected = []
+    for _ in range(min(top_n, candidates.size)):
+        np.subtract(weighted_relevance, (1 - diversity_lambda) * max_sim, out=scores)
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        if min_score is not None and scores[best] <= min_score:
+            break
+
+        best_idx = int(candidates[best])
+        selected.append((best_idx, float(scores[best])))
+        available[best] = False
+
+        np.maximum(max_sim, similarity_row(best_idx, candidates), out=max_sim)
+
+    return selected
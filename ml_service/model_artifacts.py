@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, Tuple, Union
+
+import numpy as np
+import scipy.sparse as sp
+
+# Bumped whenever the on-disk layout changes; older artifacts are rejected
+ARTIFACT_FORMAT = 3
+
+META_FILE = "meta.json"
+
+
+def save_artifact(directory: str, arrays: Dict[str, np.ndarray], meta: Dict) -> None:
+    """Write arrays as .npy files next to a meta.json.
+
+    directory must not exist yet: files other processes may have mapped are
+    never overwritten. publish_version() gives a fresh directory and switches
+    readers to it once everything in it is written.
+    """
+    os.makedirs(directory)
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, name + ".npy"), np.ascontiguousarray(array))
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(
+            {"format": ARTIFACT_FORMAT, "arrays": list(arrays), **meta},
+            f,
+            default=str,
+        )
+
+
+def publish_version(directory: str, write: Callable[[str], None], keep: int = 2) -> str:
+    """Write a new version of directory and switch readers to it atomically.
+
+    directory is a symlink to <directory>.versions/<version>. write(path)
+    fills a fresh version directory, then a new symlink is renamed over
+    directory, so a reader resolving it (see resolve_version) sees either the
+    previous version or this one in full, never a mix or nothing. Only the
+    newest keep versions are kept; processes that still map files of older
+    ones keep them alive until they unmap. Returns the new version's path.
+    """
+    directory = os.path.abspath(directory)
+    versions = directory + ".versions"
+    os.makedirs(versions, exist_ok=True)
+    # Named by creation time, so sorting the names sorts the versions
+    version = tempfile.mkdtemp(prefix=f"{time.time_ns()}-", dir=versions)
+    os.chmod(version, 0o755)
+    try:
+        write(version)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    link = f"{directory}.{os.getpid()}.link"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.relpath(version, os.path.dirname(directory)), link)
+    if os.path.isdir(directory) and not os.path.islink(directory):
+        # Written before artifacts were versioned
+        shutil.rmtree(directory)
+    os.replace(link, directory)
+
+    for name in sorted(os.listdir(versions))[:-keep]:
+        path = os.path.join(versions, name)
+        if path != version:
+            shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+def resolve_version(directory: str) -> str:
+    """The version directory currently published as directory; load every
+    part of one set of artifacts from it so they all match"""
+    return os.path.realpath(directory)
+
+
+def load_artifact(
+    directory: str, mmap: bool = True
+) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """Arrays and metadata written by save_artifact.
+
+    With mmap the arrays are read-only memory maps, so every worker process
+    that loads the same artifact shares one copy through the page cache.
+    """
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(
+            f"Unsupported model artifact format {meta.get('format')} in {directory}"
+        )
+
+    arrays = {
+        name: np.load(
+            os.path.join(directory, name + ".npy"), mmap_mode="r" if mmap else None
+        )
+        for name in meta["arrays"]
+    }
+    return arrays, meta
+
+
+def csr_arrays(
+    name: str, matrix: Union[sp.csr_matrix, sp.csc_matrix]
+) -> Dict[str, np.ndarray]:
+    """The component arrays of a CSR (or CSC) matrix, prefixed with name"""
+    return {
+        f"{name}_data": matrix.data,
+        f"{name}_indices": matrix.indices,
+        f"{name}_indptr": matrix.indptr,
+    }
+
+
+def csr_from_arrays(
+    name: str, arrays: Dict[str, np.ndarray], shape: Tuple[int, int]
+) -> sp.csr_matrix:
+    """Rebuild a CSR matrix from csr_arrays() output without copying it"""
+    return sp.csr_matrix(
+        (arrays[f"{name}_data"], arrays[f"{name}_indices"], arrays[f"{name}_indptr"]),
+        shape=tuple(shape),
+        copy=False,
+    )
+
+
+def csc_from_arrays(
+    name: str, arrays: Dict[str, np.ndarray], shape: Tuple[int, int]
+) -> sp.csc_matrix:
+    """csr_from_arrays() for a CSC matrix"""
+    return sp.csc_matrix(
+        (arrays[f"{name}_data"], arrays[f"{name}_indices"], arrays[f"{name}_indptr"]),
+        shape=tuple(shape),
+        copy=False,
+    )
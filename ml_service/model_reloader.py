@@ -0,0 +1,167 @@
+import copy
+import threading
+import time
+import traceback
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from certificates_recommender import CertificateRecommender
+from feature_engineer import RecommenderFeaturizer
+from positions_recommender import PositionsRecommender
+
+
+class Models(NamedTuple):
+    """One consistent set of trained models; never mutated once built"""
+
+    certificates: CertificateRecommender
+    positions: PositionsRecommender
+    featurizer: RecommenderFeaturizer
+
+
+def refit_models(models: Models) -> Models:
+    """Copies of both models retrained on their current catalogs"""
+    certificates = copy.copy(models.certificates)
+    certificates.refit()
+    positions = copy.copy(models.positions)
+    positions.refit()
+    return models._replace(certificates=certificates, positions=positions)
+
+
+class ModelReloader:
+    """Holds the live Models and rebuilds them off the request path.
+
+    Requests read `models` once and keep using that snapshot, so a reload
+    swapping in a new one (a single reference assignment) never affects
+    requests in flight and no request waits for training. A background thread
+    rebuilds every `interval` seconds (0 disables the timer) or as soon as
+    request_reload() is called; `load` gives the first models (e.g. from an
+    artifact) and defaults to `build`.
+
+    Single catalog changes go through apply() instead, which swaps in
+    incrementally edited copies; once a model has max_edits edits the thread
+    refits it on its current catalog to undo the IDF drift they leave.
+    Neither training nor edits run under the lock, which only guards swaps;
+    edits applied while a rebuild runs are replayed on its models before they
+    are swapped in.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], Models],
+        interval: float = 0,
+        max_edits: int = 100,
+        load: Optional[Callable[[], Models]] = None,
+    ):
+        self._build = build
+        self.interval = interval
+        self.max_edits = max_edits
+        self.models = (load or build)()
+        self.reloaded_at = time.time()
+        self.last_error = None
+        self._requested = threading.Event()
+        self._refit_requested = False
+        # _lock guards swaps of self.models and is only held briefly;
+        # _rebuild_lock serializes the (slow) full rebuilds with each other
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._pending_edits = None  # Edits applied while a rebuild runs
+        self._thread = None
+
+    def replace(self, build: Callable[[Models], Models]) -> Tuple[Models, Models]:
+        """Swap in build(models), computed without holding the lock.
+
+        Returns the (previous, new) models.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._pending_edits = []
+                current = self.models
+            try:
+                models = build(current)
+                while True:
+                    with self._lock:
+                        edits, self._pending_edits = self._pending_edits, []
+                        if not edits:
+                            previous, self.models = self.models, models
+                            return previous, models
+                    for edit in edits:
+                        models = edit(models)
+            finally:
+                with self._lock:
+                    self._pending_edits = None
+
+    def reload(self) -> bool:
+        """Build new models and swap them in; True if a model version changed"""
+        previous, models = self.replace(lambda _: self._build())
+        self.reloaded_at = time.time()
+        return (
+            models.certificates.model_version != previous.certificates.model_version
+            or models.positions.model_version != previous.positions.model_version
+        )
+
+    def apply(self, edit: Callable[[Models], Models]) -> Models:
+        """Swap in edit(models); edit must return new models, not mutate them.
+
+        edit runs outside the lock (it may fetch from the API), so a slow one
+        holds up neither reloads nor other edits; if the models were swapped
+        meanwhile it runs again on the new ones.
+        """
+        while True:
+            current = self.models
+            models = edit(current)
+            with self._lock:
+                if self.models is not current:
+                    continue
+                self.models = models
+                if self._pending_edits is not None:
+                    self._pending_edits.append(edit)
+                if (
+                    max(models.certificates.edits, models.positions.edits)
+                    >= self.max_edits
+                ):
+                    self._refit_requested = True
+                    self._requested.set()
+                return models
+
+    def refit(self) -> None:
+        """Retrain both models on their current catalogs, keeping all edits"""
+        self.replace(refit_models)
+
+    def request_reload(self) -> None:
+        """Ask the background thread to reload now; returns immediately"""
+        self._requested.set()
+
+    def start(self) -> "ModelReloader":
+        """Start the background reload thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="model-reloader", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self._requested.wait(self.interval or None)
+            self._requested.clear()
+            refit, self._refit_requested = self._refit_requested, False
+            try:
+                if refit:
+                    self.refit()
+                else:
+                    self.reload()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the previous models; retry on the next tick
+                self.last_error = str(e)
+                traceback.print_exc()
+
+    def stats(self) -> Dict:
+        return {
+            "certificates_version": self.models.certificates.model_version,
+            "positions_version": self.models.positions.model_version,
+            "certificates_edits": self.models.certificates.edits,
+            "positions_edits": self.models.positions.edits,
+            "reloaded_at": self.reloaded_at,
+            "interval": self.interval,
+            "last_error": self.last_error,
+        }
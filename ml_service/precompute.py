@@ -0,0 +1,101 @@
+"""Precompute recommendations for every user into the recommendation store.
+
+Usage: python precompute.py [--user-ids 1 2 3] [--chunk-size 500]
+
+Meant to run out of band (e.g. nightly); the Flask routes serve these rows
+while they are fresh and fall back to live scoring otherwise.
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from batch import batch_responses
+from catalog_loader import train_models
+from data_fetcher import DataFetcher
+from feature_engineer import RecommenderFeaturizer, noUser
+from recommendation_store import RecommendationStore
+
+load_dotenv()
+
+# Results stored per user; the routes can serve any top_n up to these
+CERTIFICATE_RESULTS = int(os.getenv("PRECOMPUTE_CERTIFICATE_RESULTS", 5))
+POSITION_RESULTS = int(os.getenv("PRECOMPUTE_POSITION_RESULTS", 100))
+
+
+def precompute(
+    data_fetcher: DataFetcher,
+    store: RecommendationStore,
+    user_ids=None,
+    chunk_size: int = 500,
+) -> int:
+    """Compute and store both recommendation bodies for the given users (all
+    users by default). Returns how many users were stored."""
+    featurizer = RecommenderFeaturizer(data_fetcher)
+    certificate_recommender, positions_recommender = train_models(
+        data_fetcher, featurizer.skill_ids
+    )
+    if user_ids is None:
+        user_ids = data_fetcher.get_all_user_ids()
+
+    stored = 0
+    for start in range(0, len(user_ids), chunk_size):
+        users_data = data_fetcher.get_users_data(user_ids[start : start + chunk_size])
+        users_data = {
+            user_id: user_data
+            for user_id, user_data in users_data.items()
+            if not noUser(user_data)
+        }
+
+        responses = batch_responses(
+            users_data,
+            featurizer,
+            certificate_recommender,
+            positions_recommender,
+            certificate_top_n=CERTIFICATE_RESULTS,
+            position_top_n=POSITION_RESULTS,
+        )
+        store.put_many(
+            row
+            for user_id, bodies in responses.items()
+            for row in (
+                (
+                    user_id,
+                    "certificates",
+                    certificate_recommender.model_version,
+                    CERTIFICATE_RESULTS,
+                    bodies["certificates"],
+                ),
+                (
+                    user_id,
+                    "positions",
+                    positions_recommender.model_version,
+                    POSITION_RESULTS,
+                    bodies["positions"],
+                ),
+            )
+        )
+        stored += len(responses)
+
+    return stored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-ids", type=int, nargs="*", default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stored = precompute(
+        DataFetcher(os.getenv("DATA_API_URL_HOST_DOCKER")),
+        RecommendationStore(
+            os.getenv("RECOMMENDATION_STORE_PATH", "recommendations.sqlite3")
+        ),
+        user_ids=args.user_ids,
+        chunk_size=args.chunk_size,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"Stored recommendations for {stored} users in {elapsed:.1f}s")
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class RecommendationStore:
+    """Persisted, precomputed recommendation responses in a local SQLite file.
+
+    One row per (user, kind) where kind is "certificates" or "positions",
+    holding the exact response body of the matching route, the model version
+    it was computed with and how many results were requested (top_n). A row
+    is fresh while its model version is the live one, it is younger than
+    max_age seconds and it has not been invalidated.
+    """
+
+    def __init__(self, path: str, max_age: float = 86400):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    user_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    model_version TEXT NOT NULL,
+                    top_n INTEGER NOT NULL,
+                    computed_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (user_id, kind)
+                )
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; the WAL journal lets the batch job write
+        while request threads read"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(
+        self, user_id: int, kind: str, model_version: str, top_n: int
+    ) -> Optional[Dict]:
+        """Stored response body if fresh and computed with at least top_n
+        results, trimmed to top_n; None otherwise"""
+        row = (
+            self._connection()
+            .execute(
+                "SELECT model_version, top_n, computed_at, payload "
+                "FROM recommendations WHERE user_id = ? AND kind = ?",
+                (user_id, kind),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        stored_version, stored_top_n, computed_at, payload = row
+        if (
+            stored_version != model_version
+            or stored_top_n < top_n
+            or time.time() - computed_at > self.max_age
+        ):
+            return None
+
+        body = json.loads(payload)
+        # Greedy MMR is prefix-stable, so the first top_n picks of a longer
+        # run are exactly what a top_n run would return
+        body["recommendations"] = body["recommendations"][:top_n]
+        return body
+
+    def put_many(self, rows: Iterable[Tuple[int, str, str, int, Dict]]) -> None:
+        """Store (user_id, kind, model_version, top_n, body) rows in one transaction"""
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO recommendations "
+                "(user_id, kind, model_version, top_n, computed_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, kind, model_version, top_n, now, json.dumps(body))
+                    for user_id, kind, model_version, top_n, body in rows
+                ],
+            )
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's rows, or every row if user_id is None"""
+        with self._connection() as connection:
+            if user_id is None:
+                connection.execute("DELETE FROM recommendations")
+            else:
+                connection.execute(
+                    "DELETE FROM recommendations WHERE user_id = ?", (user_id,)
+                )
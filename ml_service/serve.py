@@ -0,0 +1,72 @@
+"""Production launcher for ml_service (replaces the Flask debug server).
+
+Usage: python serve.py
+
+Serves asgi_app:app with uvicorn on FLASK_RUN_HOST:FLASK_RUN_PORT, prefork
+style: this master process makes sure the model artifact in
+MODEL_ARTIFACT_DIR exists (fetching and training once if it does not) before
+starting WORKERS worker processes (default 1), each running one event loop.
+Workers only load the artifact, memory-mapped read-only, so its matrices are
+shared through the page cache and memory stays flat as workers are added.
+
+The master also rebuilds the artifact every MODEL_REBUILD_INTERVAL seconds
+(default MODEL_RELOAD_INTERVAL, 0 disables it) and workers switch to each new
+one, so workers do not rebuild on a timer themselves. Admin routes
+(/cache/invalidate, /catalog/*/refresh, /models/reload) reach every worker
+through the WorkerEvents log in RECOMMENDATION_STORE_PATH; a catalog refresh
+is published as a new artifact version, so edited models stay shared too.
+"""
+
+import os
+import threading
+import time
+import traceback
+
+import uvicorn
+from dotenv import load_dotenv
+
+from build_models import build_artifact
+from catalog_loader import has_models
+
+load_dotenv()
+
+
+def rebuild_artifacts(directory: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            build_artifact(directory)
+        except Exception:
+            # Workers keep serving the previous artifact
+            traceback.print_exc()
+
+
+if __name__ == "__main__":
+    artifact_dir = os.getenv("MODEL_ARTIFACT_DIR", "models")
+    if not has_models(artifact_dir):
+        build_artifact(artifact_dir)
+
+    rebuild_interval = float(
+        os.getenv("MODEL_REBUILD_INTERVAL", os.getenv("MODEL_RELOAD_INTERVAL", 3600))
+    )
+    # Inherited by the workers
+    os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+    if rebuild_interval > 0:
+        threading.Thread(
+            target=rebuild_artifacts,
+            args=(artifact_dir, rebuild_interval),
+            name="artifact-builder",
+            daemon=True,
+        ).start()
+
+    uvicorn.run(
+        "asgi_app:app",
+        host=os.getenv("FLASK_RUN_HOST", "0.0.0.0"),
+        port=int(os.getenv("FLASK_RUN_PORT", 5001)),
+        workers=int(os.getenv("WORKERS", 1)),
+        # Requests beyond this many in flight per worker get a 503
+        limit_concurrency=int(os.getenv("MAX_CONCURRENT_REQUESTS", 1000)) or None,
+        timeout_keep_alive=int(os.getenv("KEEP_ALIVE_TIMEOUT", 5)),
+        proxy_headers=True,
+        access_log=os.getenv("ACCESS_LOG", "0") == "1",
+    )
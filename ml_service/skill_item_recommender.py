@@ -0,0 +1,382 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import Dict, List, Optional, Set, Tuple
+from mmr import mmr_rerank, POOL_SIZE_FACTOR
+from candidates import (
+    InvertedIndex,
+    generated_cosine_scores,
+    inverted_index_for,
+)
+from catalog_index import (
+    build_catalog_index,
+    catalog_items,
+    catalog_version,
+    coincident_skills,
+    edit_version,
+)
+from model_artifacts import (
+    csc_from_arrays,
+    csr_arrays,
+    csr_from_arrays,
+    load_artifact,
+    save_artifact,
+)
+from skill_matrix import (
+    build_skill_matrix,
+    edit_skill_matrix,
+    skill_column_lookup,
+    skill_column_mask,
+    skill_vocabulary,
+    cosine_scores,
+    cosine_scores_many,
+    ItemSimilarity,
+)
+
+
+class SkillItemRecommender:
+    """Recommender over catalog items described by their skills.
+
+    Subclasses set id_field, the key of an item's id in responses, and
+    describe_item(), its response fields from the catalog index; those with
+    per-item data of their own extend the _fit_items/_upsert_item/_remove_item
+    and _extra_arrays/_extra_meta/_load_extra hooks.
+    """
+
+    id_field = "item_id"
+
+    def __init__(self):
+        self.skill_matrix = None
+        self.catalog = {}
+        self.model_version = None
+        self.similarity = None
+        self.item_ids = []
+        self.item_index = {}
+        self.skill_ids = []
+        # skill id -> column lookup for the featurizer, see skill_column_lookup
+        self.skill_columns = None
+        # Columns some item has; user norms are taken over these only
+        self.skill_mask = None
+        # Rows still in the catalog; removed items stay as empty rows until
+        # the next full train()
+        self.active = None
+        self.edits = 0
+        # Scores only items sharing a skill with the user (large catalogs)
+        self.candidate_generator = None
+
+    def train(
+        self,
+        items: List[Dict],
+        dense_similarity: Optional[bool] = None,
+        skill_ids: Optional[List[int]] = None,
+        candidate_index: Optional[bool] = None,
+    ):
+        """Build skill matrix for all items
+
+        Fields besides "id" and "skills" are kept in self.catalog, keyed by
+        id, so responses can be assembled without calling the Express API.
+        dense_similarity forces (True) or disables (False) the precomputed
+        N x N similarity matrix; by default it is used only for catalogs up to
+        DENSE_SIMILARITY_MAX_ITEMS items. candidate_index likewise forces or
+        disables candidate generation from an inverted index, by default used
+        from CANDIDATE_INDEX_MIN_ITEMS items on.
+        """
+        # Columns follow the shared vocabulary (the featurizer's skill_ids)
+        # when given, so one user vector fits every model
+        if skill_ids is None:
+            skill_ids = skill_vocabulary(
+                skill["skill_id"] for item in items for skill in item["skills"]
+            )
+        self.skill_ids = list(skill_ids)
+        self.skill_columns = skill_column_lookup(self.skill_ids)
+
+        self.item_ids = [item["id"] for item in items]
+        self.item_index = {item_id: idx for idx, item_id in enumerate(self.item_ids)}
+        self._fit_items(items)
+
+        self.active = np.ones(len(items), dtype=bool)
+        self.edits = 0
+
+        self.catalog = build_catalog_index(items)
+        self.model_version = catalog_version(items)
+        self.skill_matrix = build_skill_matrix(items, self.skill_ids)
+        self.skill_mask = skill_column_mask(self.skill_matrix)
+        self.candidate_generator = inverted_index_for(
+            self.skill_matrix, candidate_index
+        )
+        # Item similarity: dense matrix for small catalogs, else per row
+        self.similarity = ItemSimilarity(self.skill_matrix, dense_similarity)
+
+    def refit(self):
+        """Full train() on the current catalog, folding in incremental edits"""
+        self.train(
+            catalog_items(self.catalog),
+            self.similarity.dense,
+            self.skill_ids,
+            self.candidate_generator is not None,
+        )
+
+    def upsert(self, item: Dict):
+        """Add an item, or replace the one with the same id, without a full
+        retrain.
+
+        Only the item's skill matrix row and similarity row/column are
+        recomputed, so an edit costs O(catalog) rather than a refit's
+        O(catalog^2); other rows keep their IDF weights until refit(). State is
+        replaced rather than mutated, so a shallow copy of a live recommender
+        can be edited while requests keep using the original.
+        """
+        item_id = item["id"]
+        idx = self.item_index.get(item_id, len(self.item_ids))
+        if idx == len(self.item_ids):
+            active = np.append(self.active, True)
+        else:
+            active = self.active.copy()
+            active[idx] = True
+
+        self._edit_row(idx, item["skills"], active)
+
+        if idx == len(self.item_ids):
+            self.item_ids = self.item_ids + [item_id]
+            self.item_index = {**self.item_index, item_id: idx}
+        self._upsert_item(idx, item)
+
+        self.catalog = {**self.catalog, **build_catalog_index([item])}
+        self.model_version = edit_version(self.model_version, item)
+        self.edits += 1
+
+    def remove(self, item_id: int):
+        """Drop an item from recommendations without a full retrain"""
+        idx = self.item_index.get(item_id)
+        if idx is None:
+            return
+
+        active = self.active.copy()
+        active[idx] = False
+        self._edit_row(idx, [], active)
+
+        self.item_index = {
+            key: value for key, value in self.item_index.items() if key != item_id
+        }
+        self._remove_item(idx, item_id)
+        self.catalog = {
+            key: value for key, value in self.catalog.items() if key != item_id
+        }
+        self.model_version = edit_version(self.model_version, {"removed": item_id})
+        self.edits += 1
+
+    def _edit_row(self, idx: int, skills: List[Dict], active: np.ndarray):
+        """Replace row idx of the skill matrix and everything derived from it"""
+        self.skill_matrix = edit_skill_matrix(
+            self.skill_matrix, self.skill_columns, idx, skills, int(active.sum())
+        )
+        self.skill_mask = skill_column_mask(self.skill_matrix)
+        if self.candidate_generator is not None:
+            self.candidate_generator = inverted_index_for(self.skill_matrix, True)
+        self.similarity = self.similarity.updated(self.skill_matrix, [idx])
+        self.active = active
+
+    def _fit_items(self, items: List[Dict]):
+        """Per-item state of a subclass, built by train()"""
+
+    def _upsert_item(self, idx: int, item: Dict):
+        """Update per-item state of a subclass for upsert()"""
+
+    def _remove_item(self, idx: int, item_id: int):
+        """Update per-item state of a subclass for remove()"""
+
+    def _extra_arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays of a subclass to save() with the model"""
+        return {}
+
+    def _extra_meta(self) -> Dict:
+        """Metadata of a subclass to save() with the model"""
+        return {}
+
+    def _load_extra(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        """Restore what _extra_arrays() and _extra_meta() saved"""
+
+    def save(self, directory: str) -> None:
+        """Write the trained model to directory (see model_artifacts)"""
+        if self.skill_matrix is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        arrays = {
+            **csr_arrays("skill_matrix", self.skill_matrix),
+            "active": self.active,
+            **self._extra_arrays(),
+        }
+        if self.similarity.dense:
+            arrays["similarity"] = self.similarity.matrix
+        if isinstance(self.candidate_generator, InvertedIndex):
+            arrays.update(csr_arrays("postings", self.candidate_generator.postings))
+        save_artifact(
+            directory,
+            arrays,
+            {
+                "model_version": self.model_version,
+                "edits": self.edits,
+                "shape": self.skill_matrix.shape,
+                "item_ids": self.item_ids,
+                "skill_ids": self.skill_ids,
+                "catalog": [
+                    self.catalog[item_id] if active else None
+                    for item_id, active in zip(self.item_ids, self.active)
+                ],
+                **self._extra_meta(),
+            },
+        )
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "SkillItemRecommender":
+        """Model written by save(); with mmap the matrices stay on disk"""
+        arrays, meta = load_artifact(directory, mmap)
+        recommender = cls()
+        recommender.model_version = meta["model_version"]
+        recommender.edits = meta["edits"]
+        recommender.item_ids = meta["item_ids"]
+        recommender.active = np.asarray(arrays["active"], dtype=bool)
+        recommender.item_index = {
+            item_id: idx
+            for idx, item_id in enumerate(recommender.item_ids)
+            if recommender.active[idx]
+        }
+        recommender.skill_ids = meta["skill_ids"]
+        recommender.skill_columns = skill_column_lookup(recommender.skill_ids)
+        recommender.catalog = {
+            item_id: entry
+            for item_id, entry in zip(recommender.item_ids, meta["catalog"])
+            if entry is not None
+        }
+        recommender.skill_matrix = csr_from_arrays(
+            "skill_matrix", arrays, meta["shape"]
+        )
+        recommender.skill_mask = skill_column_mask(recommender.skill_matrix)
+        postings = None
+        if "postings_data" in arrays:
+            # Saved inverted index, shared through the page cache like the rest
+            postings = csc_from_arrays("postings", arrays, meta["shape"])
+        recommender.candidate_generator = inverted_index_for(
+            recommender.skill_matrix, postings=postings
+        )
+        recommender.similarity = ItemSimilarity(
+            recommender.skill_matrix, dense=False, matrix=arrays.get("similarity")
+        )
+        recommender._load_extra(arrays, meta)
+        return recommender
+
+    def score(self, user_vector: np.ndarray) -> np.ndarray:
+        """Similarity of a user to every item"""
+        if self.skill_matrix is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        return cosine_scores(self.skill_matrix, user_vector, self.skill_mask)
+
+    def score_many(self, user_matrix: sp.spmatrix) -> np.ndarray:
+        """score() for a users x skills matrix in one sparse product"""
+        if self.skill_matrix is None:
+            raise ValueError("Model not trained. Call train() first.")
+
+        return cosine_scores_many(self.skill_matrix, user_matrix, self.skill_mask)
+
+    def generated_scores(
+        self, user_vector: np.ndarray
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """score() through the candidate generator, if any, with the items it
+        generated for select() (None without one)"""
+        if self.candidate_generator is None:
+            return self.score(user_vector), None
+        return generated_cosine_scores(
+            self.candidate_generator,
+            self.skill_matrix.shape[0],
+            user_vector,
+            self.skill_mask,
+        )
+
+    def select(
+        self,
+        similarities: np.ndarray,
+        exclude_ids: List[int],
+        top_n: int = 100,
+        diversity_lambda: float = 0.5,
+        candidate_pool: Optional[int] = None,
+        generated: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """MMR selection over precomputed similarities
+
+        Only the candidate_pool most similar items (default
+        POOL_SIZE_FACTOR * top_n) enter the MMR stage; see mmr.mmr_rerank for
+        why the ranking stays exact. generated (ascending indices) restricts
+        the selection to the items from the candidate generator; with an exact
+        one the others are only considered once those run out.
+        """
+        candidates = self.active.copy()
+        candidates[
+            [
+                self.item_index[item_id]
+                for item_id in exclude_ids
+                if item_id in self.item_index
+            ]
+        ] = False
+
+        rest = None
+        if generated is not None:
+            generated_mask = np.zeros_like(candidates)
+            generated_mask[generated] = True
+            if self.candidate_generator.exact:
+                rest = np.flatnonzero(candidates & ~generated_mask)
+            candidates &= generated_mask
+
+        selected = mmr_rerank(
+            similarities,
+            np.flatnonzero(candidates),
+            self.similarity.request_rows(),
+            top_n,
+            diversity_lambda,
+            candidate_pool=candidate_pool or POOL_SIZE_FACTOR * top_n,
+            rest=rest,
+        )
+
+        return [
+            {
+                self.id_field: self.item_ids[idx],
+                "similarity_score": float(similarities[idx]),
+                "mmr_score": mmr_score,
+            }
+            for idx, mmr_score in selected
+        ]
+
+    def describe_item(self, info: Dict) -> Dict:
+        """Response fields of an item's catalog entry besides its id, score
+        and skills"""
+        return {}
+
+    def describe(self, recommendation: Dict, user_skill_ids: Set[int]) -> Dict:
+        """Response entry for a recommended item, from the catalog index"""
+        item_id = recommendation[self.id_field]
+        info = self.catalog[item_id]
+        return {
+            self.id_field: item_id,
+            **self.describe_item(info),
+            "score": recommendation["mmr_score"],
+            "skills": info["skill_names"],
+            "coincident_skills": coincident_skills(info, user_skill_ids),
+        }
+
+    def recommend(
+        self,
+        user_vector: np.ndarray,
+        exclude_ids: List[int],
+        top_n: int = 100,
+        diversity_lambda: float = 0.5,
+        candidate_pool: Optional[int] = None,
+    ) -> List[Dict]:
+        """Get top item recommendations using MMR diversification"""
+        similarities, generated = self.generated_scores(user_vector)
+        return self.select(
+            similarities,
+            exclude_ids,
+            top_n,
+            diversity_lambda,
+            candidate_pool,
+            generated,
+        )
@@ -0,0 +1,62 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Tuple
+
+
+class SkillMatcher:
+    """Finds skill names in free text (goal descriptions) in one pass.
+
+    Skill names are compiled once into a token-level Aho-Corasick automaton:
+    a trie over the whitespace-split, lowercased names plus failure links, so
+    the text's tokens are scanned left to right exactly once whatever the
+    number or length of the names. Results are cached per text, since the
+    same goal descriptions are featurized on every request of their user.
+    """
+
+    def __init__(self, phrases: Dict[str, int], cache_size: int = 4096):
+        """phrases maps a lowercased skill name to its skill id"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for phrase, skill_id in phrases.items():
+            tokens = phrase.split()
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                child = self._goto[node].get(token)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][token] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                node = child
+            self._output[node] += (skill_id,)
+
+        # Breadth-first, so every failure target is final before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                # Names that end inside this one (e.g. "learning" in
+                # "machine learning") match here too
+                self._output[child] += self._output[self._fail[child]]
+
+        self.match = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text: str) -> Tuple[int, ...]:
+        """Ids of every skill whose name occurs in text as whole tokens"""
+        found = set()
+        node = 0
+        for token in text.lower().split():
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            found.update(self._output[node])
+        return tuple(found)
@@ -0,0 +1,216 @@
+import numpy as np
+import scipy.sparse as sp
+from typing import Callable, Dict, List, Optional, Union
+from sklearn.feature_extraction.text import TfidfTransformer
+
+
+def skill_column_lookup(skill_ids: List[int]) -> np.ndarray:
+    """Array mapping skill id -> column of a skill matrix, -1 where absent"""
+    skill_ids = np.asarray(skill_ids, dtype=np.int64)
+    lookup = np.full(skill_ids.max() + 1 if len(skill_ids) else 0, -1, dtype=np.int64)
+    lookup[skill_ids] = np.arange(len(skill_ids))
+    return lookup
+
+
+def build_skill_matrix(items: List[Dict], skill_ids: List[int]) -> sp.csr_matrix:
+    """Build the L2-normalized TF-IDF item x skill matrix in CSR form"""
+    skill_index = {skill_id: idx for idx, skill_id in enumerate(skill_ids)}
+    rows = []
+    cols = []
+    for row, item in enumerate(items):
+        for skill in item["skills"]:
+            col = skill_index.get(skill["skill_id"])
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    presence = sp.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(len(items), len(skill_ids)),
+    )
+    # Repeated skills on an item count once, like the dense 0/1 matrix did
+    presence.sum_duplicates()
+    presence.data[:] = 1
+
+    transformer = TfidfTransformer(norm="l2", use_idf=True)
+    return transformer.fit_transform(presence).tocsr()
+
+
+def skill_vocabulary(skill_ids) -> List[int]:
+    """The shared, stable column order for skill matrices and user vectors:
+    the distinct skill ids, sorted"""
+    return sorted(set(skill_ids))
+
+
+def skill_column_mask(skill_matrix: sp.csr_matrix) -> np.ndarray:
+    """Columns that at least one item of the skill matrix has"""
+    return np.bincount(skill_matrix.indices, minlength=skill_matrix.shape[1]) > 0
+
+
+def edit_skill_matrix(
+    skill_matrix: sp.csr_matrix,
+    skill_columns: np.ndarray,
+    idx: int,
+    skills: List[Dict],
+    n_items: int,
+) -> sp.csr_matrix:
+    """Copy of the skill matrix with row idx (appended if past the end) set to
+    an item with the given skills, weighted with the current IDF"""
+    cleared = _set_row(skill_matrix, idx, np.array([], dtype=int), np.array([]))
+
+    skill_ids = np.array([skill["skill_id"] for skill in skills], dtype=np.int64)
+    skill_ids = skill_ids[(skill_ids >= 0) & (skill_ids < len(skill_columns))]
+    cols = np.unique(skill_columns[skill_ids])
+    cols = cols[cols >= 0]
+    # Smoothed IDF as in TfidfTransformer, counting this item's skills
+    document_frequency = (
+        np.bincount(cleared.indices, minlength=skill_matrix.shape[1])[cols] + 1
+    )
+    weights = np.log((1 + n_items) / (1 + document_frequency)) + 1
+    if len(weights):
+        weights = weights / np.linalg.norm(weights)
+
+    return _set_row(cleared, idx, cols, weights)
+
+
+def _set_row(
+    matrix: sp.csr_matrix, idx: int, cols: np.ndarray, values: np.ndarray
+) -> sp.csr_matrix:
+    """Copy of a CSR matrix with row idx replaced (or appended), in O(nnz)"""
+    if idx < matrix.shape[0]:
+        start, end = matrix.indptr[idx], matrix.indptr[idx + 1]
+    else:
+        start = end = matrix.nnz
+    data = np.concatenate([matrix.data[:start], values, matrix.data[end:]])
+    indices = np.concatenate(
+        [matrix.indices[:start], cols, matrix.indices[end:]]
+    ).astype(matrix.indices.dtype)
+    indptr = np.concatenate(
+        [
+            matrix.indptr[: idx + 1],
+            matrix.indptr[idx + 1 :] + len(cols) - (end - start),
+            [] if idx < matrix.shape[0] else [start + len(cols)],
+        ]
+    ).astype(matrix.indptr.dtype)
+    return sp.csr_matrix(
+        (data, indices, indptr),
+        shape=(max(matrix.shape[0], idx + 1), matrix.shape[1]),
+        copy=False,
+    )
+
+
+def cosine_scores(
+    skill_matrix: sp.csr_matrix,
+    user_vector: Union[np.ndarray, sp.spmatrix],
+    column_mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Cosine similarity of a user vector to every row of the skill matrix"""
+    user = sp.csr_matrix(user_vector).reshape(1, -1)
+    return cosine_scores_many(skill_matrix, user, column_mask)[0]
+
+
+def cosine_scores_many(
+    skill_matrix: sp.csr_matrix,
+    user_matrix: sp.spmatrix,
+    column_mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Cosine similarity of every user row to every item, as users x items;
+    user norms count only the column_mask columns (see skill_column_mask)"""
+    user_matrix = sp.csr_matrix(user_matrix)
+    scores = (skill_matrix @ user_matrix.T).T.toarray()
+    return scores / user_norms(user_matrix, column_mask)[:, None]
+
+
+def user_norms(
+    user_matrix: sp.spmatrix, column_mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """L2 norm of every user row (over column_mask only, if given); 1 for
+    empty rows so dividing by it leaves them 0"""
+    user_matrix = sp.csr_matrix(user_matrix)
+    squares = user_matrix.multiply(user_matrix)
+    if column_mask is None:
+        squares = np.asarray(squares.sum(axis=1)).ravel()
+    else:
+        squares = squares @ column_mask.astype(float)
+    norms = np.sqrt(squares)
+    norms[norms == 0] = 1
+    return norms
+
+
+# Catalogs up to this size precompute the dense item x item similarity matrix
+# (2k items is ~32 MB of float64); larger ones compute rows on demand.
+DENSE_SIMILARITY_MAX_ITEMS = 2000
+
+
+class ItemSimilarity:
+    """Item-item cosine similarity: a precomputed N x N matrix (dense) or rows
+    computed on demand (lazy)"""
+
+    def __init__(
+        self,
+        skill_matrix: sp.csr_matrix,
+        dense: Optional[bool] = None,
+        matrix: Optional[np.ndarray] = None,
+    ):
+        """matrix passes a dense similarity matrix loaded from a model artifact"""
+        self.skill_matrix = skill_matrix
+        if matrix is None:
+            if dense is None:
+                dense = skill_matrix.shape[0] <= DENSE_SIMILARITY_MAX_ITEMS
+            matrix = (skill_matrix @ skill_matrix.T).toarray() if dense else None
+        self.matrix = matrix
+
+    @property
+    def dense(self) -> bool:
+        return self.matrix is not None
+
+    def row(self, idx: int) -> np.ndarray:
+        """Similarity of item idx to every item"""
+        if self.matrix is not None:
+            return self.matrix[idx]
+        return self._compute_row(idx)
+
+    def _compute_row(self, idx: int) -> np.ndarray:
+        return self.skill_matrix @ self._item_vector(idx)
+
+    def _item_vector(self, idx: int) -> np.ndarray:
+        """Dense skill vector of item idx"""
+        start, end = self.skill_matrix.indptr[idx], self.skill_matrix.indptr[idx + 1]
+        item = np.zeros(self.skill_matrix.shape[1])
+        item[self.skill_matrix.indices[start:end]] = self.skill_matrix.data[start:end]
+        return item
+
+    def updated(self, skill_matrix: sp.csr_matrix, rows: List[int]) -> "ItemSimilarity":
+        """New similarity over an edited skill matrix in which only `rows`
+        changed; this instance is left untouched"""
+        if self.matrix is None:
+            return ItemSimilarity(skill_matrix, dense=False)
+
+        n_items = skill_matrix.shape[0]
+        size = self.matrix.shape[0]
+        matrix = np.zeros((n_items, n_items))
+        matrix[:size, :size] = self.matrix
+
+        similarity = ItemSimilarity(skill_matrix, matrix=matrix)
+        for idx in rows:
+            values = similarity._compute_row(idx)
+            matrix[idx, :] = values
+            matrix[:, idx] = values
+        return similarity
+
+    def request_rows(self) -> Callable[[int, np.ndarray], np.ndarray]:
+        """similarity_row callable for mmr_rerank; lazy rows are computed over
+        the candidates only, not the whole catalog"""
+        if self.matrix is not None:
+            return lambda idx, candidates: self.matrix[idx, candidates]
+
+        pool = {"candidates": None}
+
+        def similarity_row(idx: int, candidates: np.ndarray) -> np.ndarray:
+            # mmr_rerank passes the same array for every pick from a pool, so
+            # its skill matrix rows are sliced once
+            if pool["candidates"] is not candidates:
+                pool.update(candidates=candidates, rows=self.skill_matrix[candidates])
+            return pool["rows"] @ self._item_vector(idx)
+
+        return similarity_row
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class UserCache:
+    """Bounded per-user cache of fetched user data and computed user vectors.
+
+    One entry per user holds the raw data from DataFetcher.get_user_data and
+    the user vectors built from it, keyed by model (e.g. the recommender's
+    model version). Entries are evicted least-recently-used once max_users is
+    reached and expire ttl seconds after the user data was fetched, taking
+    their vectors with them. invalidate() drops a user as soon as the Express
+    API reports a change.
+    """
+
+    def __init__(self, max_users: int = 10000, ttl: float = 300):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate() so a fetch that raced with it is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, user_id: int) -> Optional[Dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["fetched_at"] > self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def get_user_data(self, user_id: int, fetch: Callable[[], Dict]) -> Dict:
+        """Cached user data, calling fetch() on a miss"""
+        data, generation = self._lookup(user_id)
+        if data is not None:
+            return data
+        return self._store(user_id, fetch(), generation)
+
+    async def get_user_data_async(
+        self, user_id: int, fetch: Callable[[], Awaitable[Dict]]
+    ) -> Dict:
+        """get_user_data for coroutine fetchers (the ASGI app)"""
+        data, generation = self._lookup(user_id)
+        if data is not None:
+            return data
+        return self._store(user_id, await fetch(), generation)
+
+    def _lookup(self, user_id: int) -> Tuple[Optional[Dict], int]:
+        """Cached data (None on a miss) and the generation a fetch starts in"""
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is not None:
+                self.hits += 1
+                return entry["data"], self._generation
+            self.misses += 1
+            return None, self._generation
+
+    def _store(self, user_id: int, data: Dict, generation: int) -> Dict:
+        with self._lock:
+            if generation != self._generation:
+                return data
+            self._entries[user_id] = {
+                "data": data,
+                "vectors": {},
+                "fetched_at": time.monotonic(),
+            }
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return data
+
+    def get_user_vector(
+        self, user_id: int, model_key: Hashable, build: Callable[[], Any]
+    ) -> Any:
+        """Cached user vector for a model, calling build() on a miss.
+
+        The vector is only stored while the user's data is cached, so it never
+        outlives the data it was built from.
+        """
+        with self._lock:
+            entry = self._entry(user_id)
+            if entry is not None and model_key in entry["vectors"]:
+                return entry["vectors"][model_key]
+
+        vector = build()
+
+        with self._lock:
+            if entry is not None and self._entries.get(user_id) is entry:
+                entry["vectors"][model_key] = vector
+        return vector
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Forget one user, or everyone if user_id is None"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "max_users": self.max_users,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class WorkerEvents:
+    """Log of admin actions shared by every worker process through SQLite.
+
+    Each worker keeps its own caches and models, so an admin route (cache
+    invalidation, a catalog refresh, a model rebuild) handled by one worker
+    is published here and every other worker replays it: follow() polls for
+    events past the last one it handled and passes them to a handler. Events
+    are numbered in publish order; ones older than max_age seconds are
+    dropped.
+    """
+
+    def __init__(self, path: str, max_age: float = 86400):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS worker_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pid INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    published_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+        self._thread = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, as in RecommendationStore"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def publish(self, kind: str, payload: Optional[Dict] = None) -> int:
+        """Record an event for the other workers; returns its number"""
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM worker_events WHERE published_at < ?",
+                (now - self.max_age,),
+            )
+            cursor = connection.execute(
+                "INSERT INTO worker_events (pid, kind, published_at, payload) "
+                "VALUES (?, ?, ?, ?)",
+                (os.getpid(), kind, now, json.dumps(payload or {})),
+            )
+            return cursor.lastrowid
+
+    def last(self) -> int:
+        """Number of the newest event, 0 if none"""
+        query = "SELECT MAX(seq) FROM worker_events"
+        return self._connection().execute(query).fetchone()[0] or 0
+
+    def between(
+        self, after: int, until: Optional[int] = None
+    ) -> List[Tuple[int, int, str, Dict]]:
+        """(seq, pid, kind, payload) of the events after `after`, up to and
+        including `until`, in publish order"""
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT seq, pid, kind, payload FROM worker_events "
+                "WHERE seq > ? AND seq <= ? ORDER BY seq",
+                (after, until if until is not None else 2**63 - 1),
+            )
+            .fetchall()
+        )
+        return [
+            (seq, pid, kind, json.loads(payload)) for seq, pid, kind, payload in rows
+        ]
+
+    def follow(
+        self,
+        handler: Callable[[int, str, Dict], None],
+        after: int,
+        interval: float = 1,
+    ) -> "WorkerEvents":
+        """Start a thread calling handler(seq, kind, payload) for every event
+        after `after` published by another process, polling every interval
+        seconds (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(handler, after, interval),
+                name="worker-events",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def _run(self, handler: Callable[[int, str, Dict], None], after: int, interval):
+        pid = os.getpid()
+        while True:
+            try:
+                events = self.between(after)
+            except Exception:
+                traceback.print_exc()
+                events = []
+            for seq, event_pid, kind, payload in events:
+                try:
+                    if event_pid != pid:
+                        handler(seq, kind, payload)
+                except Exception:
+                    # Skipped; the next model reload brings this worker back
+                    # in line with the others
+                    traceback.print_exc()
+                after = seq
+            time.sleep(interval)
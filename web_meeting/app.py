@@ -6,10 +6,17 @@ from datetime import datetime # for timestamping the uploaded file
 import uuid # for generating unique meeting IDs
 import sys # for system-level operations
 import os # for file operations
+import re # for validating meeting IDs used in file names
+import shutil # for appending received chunks to recordings
+import tempfile # for holding a chunk while it is received
+from threading import Lock # for serializing chunk appends
 from dotenv import load_dotenv # for loading environment variables
 
 from utils.Debugger import Debugger
 from utils.RateLimiter import RateLimiter
+from utils.SessionRegistry import SessionRegistry
+from utils.RedisSessionRegistry import RedisSessionRegistry
+from utils.MeetingLifecycle import MeetingLifecycle
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -17,16 +24,44 @@ load_dotenv()
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
-socketio = SocketIO(app, cors_allowed_origins="*", manage_session=False)
+# With a message queue (e.g. redis://...) emits reach sockets connected to any node.
+# async_mode is picked automatically unless set (serve.py runs it on eventlet)
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    manage_session=False,
+    message_queue=os.getenv('SOCKETIO_MESSAGE_QUEUE'),
+    async_mode=os.getenv('SOCKETIO_ASYNC_MODE') or None,
+    ping_interval=float(os.getenv('SOCKETIO_PING_INTERVAL', 25)), # Seconds between heartbeats
+    ping_timeout=float(os.getenv('SOCKETIO_PING_TIMEOUT', 20)), # Seconds without a pong before a socket is dropped
+)
 
 UPLOAD_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..' ,'web_recordings'))
-
-# In-memory storage for each session
-session_storage = {}
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)) # Largest chunk accepted by /api/upload-video/chunk
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024 # Bytes read from the request stream at a time
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024 # Chunks larger than this are held in a temp file rather than in memory
+upload_locks = [Lock() for _ in range(64)] # Striped per meeting, so two appends to one recording never interleave
+
+# Storage for each session, indexed by meeting and by socket: in-memory by
+# default, shared by every node when MEETING_STATE_URL is set (redis://... or
+# fakeredis:// for a local stand-in)
+if os.getenv('MEETING_STATE_URL'):
+    session_storage = RedisSessionRegistry.from_url(os.getenv('MEETING_STATE_URL'))
+else:
+    session_storage = SessionRegistry()
 
 # Central RateLimiter
 rate_limiter = RateLimiter(max_users_per_meeting=3, rate_limit_time_window=5)
 
+# Evicts empty and idle meetings from session_storage and the rate limiter
+meeting_lifecycle = MeetingLifecycle(
+    session_storage,
+    rate_limiter,
+    empty_grace_period=float(os.getenv('MEETING_EMPTY_GRACE_PERIOD', 300)),
+    idle_ttl=float(os.getenv('MEETING_IDLE_TTL', 86400)),
+    sweep_interval=float(os.getenv('MEETING_SWEEP_INTERVAL', 60)),
+)
+
 # Setup routes and sockets
 @app.route('/api/create-meeting', methods=['POST'])
 def create_meeting():
@@ -37,14 +72,9 @@ def create_meeting():
     if not username:
         return jsonify({'error': 'Username cannot be empty'}), 400
 
-    if meeting_id in session_storage:
+    if not session_storage.create_meeting(meeting_id, username):
         return jsonify({'error': 'Meeting ID already exists, please try again'}), 400
 
-    session_storage[meeting_id] = {
-        'host': username,
-        'users': {},  # {username: sid}
-    }
-
     Debugger.log_message('INFO', f'User {username} created a new meeting with ID: {meeting_id}')
     print(f"Meeting created: {meeting_id}")
     print(f"Current session storage: {session_storage}")
@@ -54,19 +84,26 @@ def create_meeting():
 @app.route('/api/session/<meeting_id>', methods=['GET'])
 def get_session(meeting_id):
     Debugger.log_message('DEBUG', f'{session_storage}')
-    if meeting_id not in session_storage:
+    session = session_storage.get_meeting(meeting_id)
+    if session is None:
         return jsonify({'error': 'Meeting ID not found'}), 404
-    return jsonify(session_storage[meeting_id])
+    return jsonify(session)
 
 @app.route('/api/users/<meeting_id>', methods=['GET'])
 def get_users(meeting_id):
     Debugger.log_message('DEBUG', f'{session_storage}')
     if meeting_id not in session_storage:
         return jsonify({'error': 'Meeting ID not found'}), 404
-    if len(session_storage[meeting_id]['users']) > 7:
+    users = session_storage.get_users(meeting_id)
+    if len(users) > 7:
         return jsonify({'error': 'Meeting is full'}), 404
 
-    return jsonify(list(session_storage[meeting_id]['users'].keys()))
+    return jsonify(users)
+
+
+@app.route('/api/meetings/stats', methods=['GET'])
+def get_meeting_stats():
+    return jsonify(meeting_lifecycle.stats())
 
 
 @socketio.on('join')
@@ -80,8 +117,12 @@ def handle_join(data):
         return
 
     # Proceed with the join process
-    session = session_storage[meeting_id]
-    session['users'][username] = request.sid
+    previous = session_storage.join(meeting_id, username, request.sid)
+    if previous is not None:
+        # This socket was in another meeting (or under another name) before
+        previous_meeting_id, previous_username = previous
+        rate_limiter.updateMeetingCount(previous_meeting_id, "leave")
+        emit('user_left', {'meeting_id': previous_meeting_id, 'username': previous_username}, room=previous_meeting_id)
 
     # Emit user_joined event
     emit('user_joined', {'username': username, 'meeting_id': meeting_id}, room=meeting_id)
@@ -89,22 +130,17 @@ def handle_join(data):
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    to_delete = []
-    for meeting_id, session in session_storage.items():
-        if request.sid in session['users'].values():
-            username = [username for username, sid in session['users'].items() if sid == request.sid][0]
-            del session['users'][username]
-            if len(session['users']) == 0:
-                to_delete.append(meeting_id)
-            Debugger.log_message('INFO', f'User {request.sid} left the meeting', meeting_id)
+    membership = session_storage.leave(request.sid)
+    if membership is None:
+        return
 
-            # Update rate limiter meta data
-            rate_limiter.updateMeetingCount(meeting_id, "leave")
+    meeting_id, username = membership
+    Debugger.log_message('INFO', f'User {request.sid} left the meeting', meeting_id)
 
-            emit('user_left', {'meeting_id': meeting_id, 'username': username}, room=meeting_id)
+    # Update rate limiter meta data
+    rate_limiter.updateMeetingCount(meeting_id, "leave")
 
-    # for meeting_id in to_delete:
-    #     del session_storage[meeting_id]
+    emit('user_left', {'meeting_id': meeting_id, 'username': username}, room=meeting_id)
 
 
 
@@ -150,6 +186,153 @@ def upload_file():
     return 'Invalid file type. Only video files are allowed.', 400
 
 
+"""
+/////////
+ENDPOINTS chunked recording upload
+/////////
+The client streams MediaRecorder chunks as they are produced:
+- POST /api/upload-video/init {meeting_id, resume} -> {offset}
+- POST /api/upload-video/chunk?meeting_id=...&offset=N, raw chunk as body -> {offset}
+- GET /api/upload-video/status?meeting_id=... -> {offset}
+- POST /api/upload-video/finalize {meeting_id, size}
+Chunks are appended to recording_<meeting_id>.webm.part, which finalize
+renames to recording_<meeting_id>.webm. A chunk whose offset is not the
+current size of the part file gets a 409 with the offset to resume from.
+"""
+def get_upload_paths(meeting_id):
+    """
+    Function to get the (part, final) recording paths of a meeting, or None for an invalid meeting_id
+    """
+    if not meeting_id or not re.fullmatch(r'[A-Za-z0-9_-]+', meeting_id): # meeting_id ends up in a file name
+        return None
+    file_path = os.path.join(UPLOAD_FOLDER, f'recording_{meeting_id}.webm')
+    return f'{file_path}.part', file_path
+
+def get_upload_lock(meeting_id):
+    """
+    Function to get the lock guarding a meeting's part file
+    """
+    return upload_locks[hash(meeting_id) % len(upload_locks)]
+
+def get_upload_offset(part_path):
+    """
+    Function to get the number of bytes received so far, or None if no upload is in progress
+    """
+    try:
+        return os.path.getsize(part_path)
+    except FileNotFoundError:
+        return None
+
+@app.route('/api/upload-video/init', methods=['POST'])
+def init_upload():
+    data = request.get_json(silent=True) or {}
+    meeting_id = data.get('meeting_id')
+    paths = get_upload_paths(meeting_id)
+    if paths is None:
+        return jsonify({'error': 'A valid meeting_id is required'}), 400
+    part_path, _ = paths
+
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    with get_upload_lock(meeting_id):
+        if data.get('resume') and get_upload_offset(part_path) is not None:
+            offset = get_upload_offset(part_path) # Keep what was received before
+        else:
+            open(part_path, 'wb').close() # Start a new recording
+            offset = 0
+
+    Debugger.log_message('INFO', f'Recording upload started at offset {offset}', meeting_id)
+    return jsonify({'offset': offset})
+
+@app.route('/api/upload-video/status', methods=['GET'])
+def get_upload_status():
+    meeting_id = request.args.get('meeting_id')
+    paths = get_upload_paths(meeting_id)
+    if paths is None:
+        return jsonify({'error': 'A valid meeting_id is required'}), 400
+
+    offset = get_upload_offset(paths[0])
+    if offset is None:
+        return jsonify({'error': 'No upload in progress for this meeting'}), 404
+    return jsonify({'offset': offset})
+
+@app.route('/api/upload-video/chunk', methods=['POST'])
+def upload_chunk():
+    meeting_id = request.args.get('meeting_id')
+    paths = get_upload_paths(meeting_id)
+    if paths is None:
+        return jsonify({'error': 'A valid meeting_id is required'}), 400
+    part_path, _ = paths
+
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({'error': 'offset is required'}), 400
+
+    if request.content_length is not None and request.content_length > UPLOAD_MAX_CHUNK_SIZE:
+        return jsonify({'error': f'Chunks are limited to {UPLOAD_MAX_CHUNK_SIZE} bytes'}), 413
+
+    current = get_upload_offset(part_path)
+    if current is None:
+        return jsonify({'error': 'No upload in progress for this meeting'}), 404
+    if offset != current:
+        # Already received (a retried chunk) or a gap: resume from current
+        return jsonify({'error': 'Offset mismatch', 'offset': current}), 409
+
+    # Receive the whole chunk before taking the lock, so a slow client only
+    # holds up its own upload. The cap is checked on the bytes actually read,
+    # as chunked requests have no Content-Length
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, dir=UPLOAD_FOLDER) as chunk:
+        received = 0
+        try:
+            while True:
+                block = request.stream.read(min(UPLOAD_COPY_BUFFER_SIZE, UPLOAD_MAX_CHUNK_SIZE + 1 - received))
+                if not block:
+                    break
+                received += len(block)
+                if received > UPLOAD_MAX_CHUNK_SIZE:
+                    return jsonify({'error': f'Chunks are limited to {UPLOAD_MAX_CHUNK_SIZE} bytes'}), 413
+                chunk.write(block)
+        except Exception as e:
+            # Nothing was appended; the client resends the chunk
+            Debugger.log_message('ERROR', f'Chunk upload interrupted: {e}', meeting_id)
+            return jsonify({'error': 'Chunk upload interrupted', 'offset': current}), 500
+
+        with get_upload_lock(meeting_id):
+            # Re-checked: another request may have appended meanwhile
+            current = get_upload_offset(part_path)
+            if current is None:
+                return jsonify({'error': 'No upload in progress for this meeting'}), 404
+            if offset != current:
+                return jsonify({'error': 'Offset mismatch', 'offset': current}), 409
+
+            chunk.seek(0)
+            with open(part_path, 'ab') as part_file:
+                shutil.copyfileobj(chunk, part_file, UPLOAD_COPY_BUFFER_SIZE)
+            return jsonify({'offset': current + received})
+
+@app.route('/api/upload-video/finalize', methods=['POST'])
+def finalize_upload():
+    data = request.get_json(silent=True) or {}
+    meeting_id = data.get('meeting_id')
+    paths = get_upload_paths(meeting_id)
+    if paths is None:
+        return jsonify({'error': 'A valid meeting_id is required'}), 400
+    part_path, file_path = paths
+
+    with get_upload_lock(meeting_id):
+        offset = get_upload_offset(part_path)
+        if offset is None:
+            return jsonify({'error': 'No upload in progress for this meeting'}), 404
+        if data.get('size') is not None and data.get('size') != offset:
+            return jsonify({'error': 'Upload incomplete', 'offset': offset}), 409
+
+        # A rename, not a copy: the chunks were written in place
+        os.replace(part_path, file_path)
+
+    Debugger.log_message('INFO', f'File saved at {file_path} ({offset} bytes)', meeting_id)
+    return 'File uploaded successfully.', 200
+
+
 
 
 
@@ -201,6 +384,7 @@ def check_meeting():
 
 
 setup_webrtc(app, socketio, session_storage, Debugger.log_message)
+meeting_lifecycle.start(socketio)
 
 if __name__ == '__main__':
     if os.getenv('TESTING', True):
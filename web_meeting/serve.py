@@ -0,0 +1,56 @@
+"""
+Production launcher for the signaling server (replaces the Werkzeug dev server).
+
+Usage: python serve.py
+
+Runs the SocketIO app on eventlet: every connection is a green thread on one
+event loop instead of an OS thread, so a node holds tens of thousands of idle
+sockets. Settings (environment):
+- HOST / PORT: where to listen (default 0.0.0.0:5002)
+- MAX_CONNECTIONS: concurrent connections served, beyond which new ones wait
+  in the listen backlog (default 20000)
+- SOCKET_BACKLOG: listen backlog (default 2048)
+- SOCKETIO_PING_INTERVAL / SOCKETIO_PING_TIMEOUT: heartbeat settings, see app.py
+- ACCESS_LOG: 1 to log every request
+"""
+import eventlet
+
+# Before anything imports socket, threading or redis
+eventlet.monkey_patch()
+
+import os # noqa: E402
+import resource # noqa: E402
+import eventlet.wsgi # noqa: E402
+
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+
+from app import app # noqa: E402
+from utils.Debugger import Debugger # noqa: E402
+
+
+def raise_open_files_limit(connections: int) -> None:
+    """
+    Function to raise the soft open-files limit so every connection gets a descriptor
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 1024 # Headroom for files, Redis and the listener
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+
+if __name__ == '__main__':
+    host = os.getenv('HOST', '0.0.0.0')
+    port = int(os.getenv('PORT', 5002))
+    max_connections = int(os.getenv('MAX_CONNECTIONS', 20000))
+
+    raise_open_files_limit(max_connections)
+    listener = eventlet.listen((host, port), backlog=int(os.getenv('SOCKET_BACKLOG', 2048)))
+    Debugger.log_message(Debugger.INFO, f'Serving on {host}:{port} (eventlet, up to {max_connections} connections)')
+    eventlet.wsgi.server(
+        listener,
+        app,
+        max_size=max_connections,
+        log_output=os.getenv('ACCESS_LOG', '0') == '1',
+    )
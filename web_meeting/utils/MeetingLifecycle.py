@@ -0,0 +1,79 @@
+from threading import Lock
+from .Debugger import Debugger
+
+
+class MeetingLifecycle:
+    """
+    Evicts finished meetings so per-meeting state does not grow forever.
+
+    A meeting is evicted once it has been empty for empty_grace_period
+    seconds (long enough for the host to join after creating it, or for
+    everyone to reconnect after a network drop), or once it has seen no
+    join, leave or signaling message for idle_ttl seconds. Eviction removes
+    it from the SessionRegistry and from the RateLimiter head counts.
+
+    Usage:
+    - lifecycle.start(socketio) to run the sweeper as a SocketIO background task
+    - lifecycle.sweep() to run one pass by hand
+    - lifecycle.stats() for live vs. evicted meeting counters
+    """
+
+    def __init__(self, session_storage, rate_limiter, empty_grace_period: float = 300, idle_ttl: float = 86400, sweep_interval: float = 60):
+        self.session_storage = session_storage
+        self.rate_limiter = rate_limiter
+        self.empty_grace_period = empty_grace_period # Seconds an empty meeting is kept
+        self.idle_ttl = idle_ttl # Seconds a meeting without any activity is kept
+        self.sweep_interval = sweep_interval # Seconds between sweeps
+        self.evicted = {'empty': 0, 'idle': 0} # Meetings evicted so far, by reason
+        self.__lock = Lock()
+        self.__started = False
+
+    def sweep(self) -> list:
+        """
+        Function to evict every expired meeting now. Returns (meeting_id, reason) pairs
+        """
+        expired = self.session_storage.evict_expired(self.empty_grace_period, self.idle_ttl)
+        for meeting_id, reason in expired:
+            self.rate_limiter.removeMeeting(meeting_id)
+            Debugger.log_message(Debugger.INFO, f'Meeting evicted ({reason})', meeting_id)
+
+        # Meetings evicted by another process sharing session_storage
+        self.rate_limiter.pruneMeetings(lambda meeting_id: meeting_id in self.session_storage)
+
+        with self.__lock:
+            for _, reason in expired:
+                self.evicted[reason] += 1
+        return expired
+
+    def start(self, socketio) -> None:
+        """
+        Function to start the background sweeper (once)
+        """
+        with self.__lock:
+            if self.__started:
+                return
+            self.__started = True
+        socketio.start_background_task(self.__run, socketio)
+
+    def __run(self, socketio) -> None:
+        while True:
+            socketio.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                Debugger.log_message(Debugger.ERROR, f'Meeting sweep failed: {e}')
+
+    def stats(self) -> dict:
+        """
+        Function to get live vs. evicted meeting counters
+        """
+        with self.__lock:
+            evicted = dict(self.evicted)
+        return {
+            'live_meetings': len(self.session_storage),
+            'tracked_head_counts': self.rate_limiter.meetingCount(),
+            'evicted_meetings': sum(evicted.values()),
+            'evicted_by_reason': evicted,
+            'empty_grace_period': self.empty_grace_period,
+            'idle_ttl': self.idle_ttl,
+        }
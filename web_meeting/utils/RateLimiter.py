@@ -20,4 +20,24 @@ class RateLimiter:
             self.__meeting_user_count[meeting_id] -= 1
             Debugger.log_message(Debugger.DEBUG, f"Meeting count: {self.__meeting_user_count[meeting_id]}")
         else:
-            raise ValueError(f"Invalid action: {action}. Expected 'join' or 'leave'.")
\ No newline at end of file
+            raise ValueError(f"Invalid action: {action}. Expected 'join' or 'leave'.")
+
+    def removeMeeting(self, meeting_id: str) -> None:
+        """
+        Function to drop the head count of a meeting that no longer exists
+        """
+        self.__meeting_user_count.pop(meeting_id, None)
+
+    def pruneMeetings(self, keep) -> None:
+        """
+        Function to drop the head counts of every meeting for which keep(meeting_id) is False
+        """
+        for meeting_id in list(self.__meeting_user_count):
+            if not keep(meeting_id):
+                self.__meeting_user_count.pop(meeting_id, None)
+
+    def meetingCount(self) -> int:
+        """
+        Function to get the number of meetings with a tracked head count
+        """
+        return len(self.__meeting_user_count)
@@ -0,0 +1,257 @@
+import json
+import time
+
+
+class RedisSessionRegistry:
+    """
+    SessionRegistry backed by Redis, so several signaling processes (on one
+    or many hosts) share the same meetings.
+
+    Same interface and semantics as SessionRegistry. Keys (all under prefix):
+    - meeting:<meeting_id> -> hash {'host': username}
+    - users:<meeting_id> -> hash {username: sid}
+    - sid:<sid> -> JSON [meeting_id, username]
+    - active:<meeting_id> -> last activity of one meeting (unix time)
+    - last_active -> sorted set of meeting_id by last activity, to scan
+    - empty_since -> sorted set of empty meeting_id by the time they emptied
+
+    Multi-key updates run as WATCH/MULTI transactions. Use from_url():
+    redis://... for a Redis server, or fakeredis://<name> for an in-process
+    stand-in (pip install fakeredis) to try it without one; registries
+    created with the same stand-in URL share their state, like nodes
+    sharing one Redis.
+    """
+
+    __fake_servers = {} # {url: fakeredis.FakeServer}, so stand-in registries with one URL share state
+
+    def __init__(self, client, prefix: str = 'web_meeting:'):
+        self.__client = client # redis.Redis with decode_responses=True
+        self.__prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = 'web_meeting:'):
+        if url.startswith('fakeredis://'):
+            import fakeredis
+            server = cls.__fake_servers.setdefault(url, fakeredis.FakeServer())
+            return cls(fakeredis.FakeRedis(server=server, decode_responses=True), prefix)
+
+        import redis
+        return cls(redis.Redis.from_url(url, decode_responses=True), prefix)
+
+    def __meeting_key(self, meeting_id: str) -> str:
+        return f'{self.__prefix}meeting:{meeting_id}'
+
+    def __users_key(self, meeting_id: str) -> str:
+        return f'{self.__prefix}users:{meeting_id}'
+
+    def __sid_key(self, sid: str) -> str:
+        return f'{self.__prefix}sid:{sid}'
+
+    def __active_key(self, meeting_id: str) -> str:
+        return f'{self.__prefix}active:{meeting_id}'
+
+    def __index_key(self, name: str) -> str:
+        return f'{self.__prefix}{name}'
+
+    def __contains__(self, meeting_id) -> bool:
+        return bool(self.__client.exists(self.__meeting_key(meeting_id)))
+
+    def __len__(self) -> int:
+        return self.__client.zcard(self.__index_key('last_active'))
+
+    def __repr__(self) -> str:
+        return f'<RedisSessionRegistry {len(self)} meetings>'
+
+    def create_meeting(self, meeting_id: str, host: str) -> bool:
+        """
+        Register a new, empty meeting. Returns False if the ID is taken
+        """
+        if not self.__client.hsetnx(self.__meeting_key(meeting_id), 'host', host):
+            return False
+        now = time.time()
+        pipe = self.__client.pipeline()
+        pipe.set(self.__active_key(meeting_id), now)
+        pipe.zadd(self.__index_key('last_active'), {meeting_id: now})
+        pipe.zadd(self.__index_key('empty_since'), {meeting_id: now})
+        pipe.execute()
+        return True
+
+    def get_meeting(self, meeting_id: str):
+        """
+        Copy of a meeting ({'host': ..., 'users': {username: sid}}), or None
+        """
+        pipe = self.__client.pipeline()
+        pipe.hget(self.__meeting_key(meeting_id), 'host')
+        pipe.hgetall(self.__users_key(meeting_id))
+        host, users = pipe.execute()
+        if host is None:
+            return None
+        return {'host': host, 'users': users}
+
+    def get_users(self, meeting_id: str) -> list:
+        """
+        Usernames connected to a meeting (empty if the meeting does not exist)
+        """
+        return self.__client.hkeys(self.__users_key(meeting_id))
+
+    def get_sid(self, meeting_id: str, username: str):
+        """
+        Socket ID of a user in a meeting, or None
+        """
+        return self.__client.hget(self.__users_key(meeting_id), username)
+
+    def touch(self, meeting_id: str) -> None:
+        """
+        Record activity (e.g. a signaling message) in a meeting
+        """
+        now = time.time()
+        pipe = self.__client.pipeline()
+        pipe.set(self.__active_key(meeting_id), now, xx=True)
+        pipe.zadd(self.__index_key('last_active'), {meeting_id: now}, xx=True)
+        pipe.execute()
+
+    def get_membership(self, sid: str):
+        """
+        (meeting_id, username) of a socket, or None
+        """
+        return self.__decode_membership(self.__client.get(self.__sid_key(sid)))
+
+    @staticmethod
+    def __decode_membership(value):
+        return tuple(json.loads(value)) if value is not None else None
+
+    def join(self, meeting_id: str, username: str, sid: str):
+        """
+        Register sid as username in a meeting.
+
+        A user rejoining replaces their previous socket. Returns the
+        (meeting_id, username) this sid was registered as before if it
+        differs (the socket switched meetings or names), otherwise None.
+        Raises KeyError if the meeting does not exist.
+        """
+        users_key = self.__users_key(meeting_id)
+
+        def transaction(pipe):
+            if not pipe.exists(self.__meeting_key(meeting_id)):
+                raise KeyError(meeting_id)
+            previous = self.__decode_membership(pipe.get(self.__sid_key(sid)))
+            if previous == (meeting_id, username):
+                return None
+
+            if previous is not None:
+                pipe.watch(self.__users_key(previous[0]))
+                previous_is_current = pipe.hget(self.__users_key(previous[0]), previous[1]) == sid
+                previous_remaining = pipe.hlen(self.__users_key(previous[0]))
+            replaced_sid = pipe.hget(users_key, username)
+            now = time.time()
+
+            pipe.multi()
+            if previous is not None and previous_is_current:
+                pipe.hdel(self.__users_key(previous[0]), previous[1])
+                if previous_remaining == 1 and previous[0] != meeting_id:
+                    pipe.zadd(self.__index_key('empty_since'), {previous[0]: now})
+            if replaced_sid is not None and replaced_sid != sid:
+                pipe.delete(self.__sid_key(replaced_sid))
+            pipe.hset(users_key, username, sid)
+            pipe.set(self.__sid_key(sid), json.dumps([meeting_id, username]))
+            pipe.set(self.__active_key(meeting_id), now)
+            pipe.zadd(self.__index_key('last_active'), {meeting_id: now})
+            pipe.zrem(self.__index_key('empty_since'), meeting_id)
+            return previous
+
+        return self.__client.transaction(
+            transaction,
+            self.__meeting_key(meeting_id),
+            users_key,
+            self.__sid_key(sid),
+            value_from_callable=True,
+        )
+
+    def leave(self, sid: str):
+        """
+        Unregister a socket. Returns its (meeting_id, username), or None if it
+        was not in a meeting
+        """
+        sid_key = self.__sid_key(sid)
+
+        def transaction(pipe):
+            membership = self.__decode_membership(pipe.get(sid_key))
+            if membership is None:
+                return None
+            meeting_id, username = membership
+            users_key = self.__users_key(meeting_id)
+            pipe.watch(users_key)
+            is_current = pipe.hget(users_key, username) == sid
+            remaining = pipe.hlen(users_key)
+            now = time.time()
+
+            pipe.multi()
+            pipe.delete(sid_key)
+            if is_current:
+                pipe.hdel(users_key, username)
+                pipe.set(self.__active_key(meeting_id), now, xx=True)
+                pipe.zadd(self.__index_key('last_active'), {meeting_id: now}, xx=True)
+                if remaining == 1:
+                    pipe.zadd(self.__index_key('empty_since'), {meeting_id: now})
+            return membership
+
+        return self.__client.transaction(transaction, sid_key, value_from_callable=True)
+
+    def evict_expired(self, empty_grace_period: float, idle_ttl: float) -> list:
+        """
+        Remove meetings that have been empty for empty_grace_period seconds
+        or inactive for idle_ttl seconds (connected users included), and the
+        sockets registered in them.
+
+        Returns a list of (meeting_id, reason) with reason 'empty' or 'idle'.
+        When several processes sweep at once, each meeting is reported by the
+        one that removed it.
+        """
+        now = time.time()
+        empty = self.__client.zrangebyscore(self.__index_key('empty_since'), '-inf', now - empty_grace_period)
+        idle = self.__client.zrangebyscore(self.__index_key('last_active'), '-inf', now - idle_ttl)
+        candidates = [(meeting_id, 'empty') for meeting_id in empty]
+        candidates += [(meeting_id, 'idle') for meeting_id in set(idle).difference(empty)]
+
+        expired = []
+        for meeting_id, reason in candidates:
+            if self.__evict(meeting_id, reason, now - empty_grace_period, now - idle_ttl):
+                expired.append((meeting_id, reason))
+        return expired
+
+    def __evict(self, meeting_id: str, reason: str, empty_before: float, active_before: float) -> bool:
+        users_key = self.__users_key(meeting_id)
+        active_key = self.__active_key(meeting_id)
+
+        def transaction(pipe):
+            # Re-check under WATCH: someone may have joined since the scan
+            empty_since = pipe.zscore(self.__index_key('empty_since'), meeting_id)
+            last_active = pipe.get(active_key)
+            last_active = float(last_active) if last_active is not None else None
+            if reason == 'empty' and (empty_since is None or empty_since > empty_before):
+                return
+            if reason == 'idle' and (empty_since is not None or last_active is None or last_active > active_before):
+                return
+            sids = pipe.hvals(users_key)
+
+            pipe.multi()
+            pipe.delete(self.__meeting_key(meeting_id))
+            pipe.delete(users_key)
+            pipe.delete(active_key)
+            for sid in sids:
+                pipe.delete(self.__sid_key(sid))
+            pipe.zrem(self.__index_key('last_active'), meeting_id)
+            pipe.zrem(self.__index_key('empty_since'), meeting_id)
+
+        # Empty if the re-check failed; otherwise results[0] is the DELETE of
+        # the meeting key, 1 only for the process that removed it
+        # active:<meeting_id> is watched too, so a touch() racing with an idle
+        # eviction aborts it; the shared last_active index is not, or every
+        # signaling message in any meeting would abort the sweep
+        results = self.__client.transaction(
+            transaction,
+            self.__meeting_key(meeting_id),
+            users_key,
+            active_key,
+        )
+        return bool(results) and results[0] == 1
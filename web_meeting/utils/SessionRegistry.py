@@ -0,0 +1,166 @@
+from threading import Lock
+import time
+
+
+class SessionRegistry:
+    """
+    In-memory registry of meetings and the users connected to them.
+
+    Keeps two indexes in sync so every lookup is constant time:
+    - meetings: {meeting_id: {'host': username, 'users': {username: sid}}}
+    - sids: {sid: (meeting_id, username)}
+
+    A socket (sid) belongs to at most one meeting at a time. Each meeting
+    also records when it was last active and since when it has been empty,
+    for evict_expired().
+    """
+
+    def __init__(self):
+        self.__meetings = {} # {meeting_id: {'host': str, 'users': {username: sid}}}
+        self.__sids = {} # {sid: (meeting_id, username)}
+        self.__last_active = {} # {meeting_id: monotonic time of the last join, leave or signal}
+        self.__empty_since = {} # {meeting_id: monotonic time it became empty}, empty meetings only
+        self.__lock = Lock()
+
+    def __contains__(self, meeting_id) -> bool:
+        return meeting_id in self.__meetings
+
+    def __len__(self) -> int:
+        return len(self.__meetings)
+
+    def __repr__(self) -> str:
+        return repr(self.__meetings)
+
+    def create_meeting(self, meeting_id: str, host: str) -> bool:
+        """
+        Register a new, empty meeting. Returns False if the ID is taken
+        """
+        with self.__lock:
+            if meeting_id in self.__meetings:
+                return False
+            now = time.monotonic()
+            self.__meetings[meeting_id] = {'host': host, 'users': {}}
+            self.__last_active[meeting_id] = now
+            self.__empty_since[meeting_id] = now
+            return True
+
+    def get_meeting(self, meeting_id: str):
+        """
+        Copy of a meeting ({'host': ..., 'users': {username: sid}}), or None
+        """
+        with self.__lock:
+            meeting = self.__meetings.get(meeting_id)
+            if meeting is None:
+                return None
+            return {'host': meeting['host'], 'users': dict(meeting['users'])}
+
+    def get_users(self, meeting_id: str) -> list:
+        """
+        Usernames connected to a meeting (empty if the meeting does not exist)
+        """
+        with self.__lock:
+            meeting = self.__meetings.get(meeting_id)
+            return list(meeting['users']) if meeting else []
+
+    def get_sid(self, meeting_id: str, username: str):
+        """
+        Socket ID of a user in a meeting, or None
+        """
+        # Lock-free: single dict reads are atomic, and this is the hot path
+        # of every signaling message
+        meeting = self.__meetings.get(meeting_id)
+        return meeting['users'].get(username) if meeting else None
+
+    def touch(self, meeting_id: str) -> None:
+        """
+        Record activity (e.g. a signaling message) in a meeting
+        """
+        with self.__lock:
+            if meeting_id in self.__meetings:
+                self.__last_active[meeting_id] = time.monotonic()
+
+    def get_membership(self, sid: str):
+        """
+        (meeting_id, username) of a socket, or None
+        """
+        return self.__sids.get(sid)
+
+    def join(self, meeting_id: str, username: str, sid: str):
+        """
+        Register sid as username in a meeting.
+
+        A user rejoining replaces their previous socket. Returns the
+        (meeting_id, username) this sid was registered as before if it
+        differs (the socket switched meetings or names), otherwise None.
+        Raises KeyError if the meeting does not exist.
+        """
+        with self.__lock:
+            users = self.__meetings[meeting_id]['users']
+            previous = self.__sids.get(sid)
+            if previous == (meeting_id, username):
+                return None
+            if previous is not None:
+                self.__remove(sid)
+
+            replaced_sid = users.get(username)
+            if replaced_sid is not None:
+                self.__sids.pop(replaced_sid, None)
+            users[username] = sid
+            self.__sids[sid] = (meeting_id, username)
+            self.__last_active[meeting_id] = time.monotonic()
+            self.__empty_since.pop(meeting_id, None)
+            return previous
+
+    def leave(self, sid: str):
+        """
+        Unregister a socket. Returns its (meeting_id, username), or None if it
+        was not in a meeting
+        """
+        with self.__lock:
+            return self.__remove(sid)
+
+    def __remove(self, sid: str):
+        membership = self.__sids.pop(sid, None)
+        if membership is None:
+            return None
+        meeting_id, username = membership
+        meeting = self.__meetings.get(meeting_id)
+        if meeting is not None and meeting['users'].get(username) == sid:
+            del meeting['users'][username]
+            now = time.monotonic()
+            self.__last_active[meeting_id] = now
+            if not meeting['users']:
+                self.__empty_since[meeting_id] = now
+        return membership
+
+    def evict_expired(self, empty_grace_period: float, idle_ttl: float) -> list:
+        """
+        Remove meetings that have been empty for empty_grace_period seconds
+        or inactive for idle_ttl seconds (connected users included), and the
+        sockets registered in them.
+
+        Returns a list of (meeting_id, reason) with reason 'empty' or 'idle'
+        """
+        now = time.monotonic()
+        with self.__lock:
+            expired = [
+                (meeting_id, 'empty')
+                for meeting_id, empty_since in self.__empty_since.items()
+                if now - empty_since >= empty_grace_period
+            ]
+            expired += [
+                (meeting_id, 'idle')
+                for meeting_id, last_active in self.__last_active.items()
+                if now - last_active >= idle_ttl and meeting_id not in self.__empty_since
+            ]
+            evicted = []
+            for meeting_id, reason in expired:
+                meeting = self.__meetings.pop(meeting_id, None)
+                self.__last_active.pop(meeting_id, None)
+                self.__empty_since.pop(meeting_id, None)
+                if meeting is None:
+                    continue # Stale timestamps of a meeting already gone
+                for sid in meeting['users'].values():
+                    self.__sids.pop(sid, None)
+                evicted.append((meeting_id, reason))
+            return evicted
@@ -6,17 +6,29 @@ def setup_webrtc(app, socketio, session_storage, log_message):
 
     @socketio.on('offer')
     def handle_offer(data):
-        to_sid = session_storage[data['meeting_id']]['users'][data['to']]
+        to_sid = session_storage.get_sid(data['meeting_id'], data['to'])
+        if to_sid is None:
+            log_message('WARNING', f'User {data["to"]} is not in the meeting', data['meeting_id'])
+            return
+        session_storage.touch(data['meeting_id'])
         log_message('INFO', f'User {data["from"]} sent an offer', data['meeting_id'])
         emit('offer', data, room=to_sid, skip_sid=request.sid)
 
     @socketio.on('answer')
     def handle_answer(data):
-        to_sid = session_storage[data['meeting_id']]['users'][data['to']]
+        to_sid = session_storage.get_sid(data['meeting_id'], data['to'])
+        if to_sid is None:
+            log_message('WARNING', f'User {data["to"]} is not in the meeting', data['meeting_id'])
+            return
+        session_storage.touch(data['meeting_id'])
         log_message('INFO', f'User {data["from"]} sent an answer', data['meeting_id'])
         emit('answer', data, room=to_sid, skip_sid=request.sid)
 
     @socketio.on('ice_candidate')
     def handle_ice_candidate(data):
-        to_sid = session_storage[data['meeting_id']]['users'][data['to']]
+        to_sid = session_storage.get_sid(data['meeting_id'], data['to'])
+        if to_sid is None:
+            log_message('WARNING', f'User {data["to"]} is not in the meeting', data['meeting_id'])
+            return
+        session_storage.touch(data['meeting_id'])
         emit('ice_candidate', data, room=to_sid, skip_sid=request.sid)
\ No newline at end of file